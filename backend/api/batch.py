@@ -0,0 +1,88 @@
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+from api.constants import BATCH_WORKERS
+
+logger = logging.getLogger('django.request')
+executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS,
+                              thread_name_prefix='batch')
+
+
+def sub_request(request, url):
+    """GET-запрос к url с заголовками и пользователем исходного запроса:
+    токен уже проверен, повторная аутентификация не нужна."""
+    path, _, query = url.partition('?')
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = {key: value for key, value in request.META.items()
+                if key not in ('CONTENT_LENGTH', 'CONTENT_TYPE')}
+    sub.META.update(REQUEST_METHOD='GET', PATH_INFO=path,
+                    QUERY_STRING=query)
+    sub.GET = QueryDict(query)
+    sub.COOKIES = request.COOKIES
+    if request.user.is_authenticated:
+        sub._force_auth_user = request.user
+        sub._force_auth_token = request.auth
+    return sub
+
+
+def response_body(response):
+    """Тело ответа для пакета: данные DRF как есть, ответ обычного
+    представления — строкой; TemplateResponse рендерится здесь, так как
+    до middleware он не доходит."""
+    if hasattr(response, 'data'):
+        return response.data
+    if hasattr(response, 'render'):
+        response.render()
+    if response.streaming:
+        return None
+    return response.content.decode(response.charset)
+
+
+def dispatch(request, url):
+    try:
+        match = resolve(url.partition('?')[0])
+    except Resolver404:
+        return {'url': url, 'status': 404,
+                'body': {'detail': 'Страница не найдена.'}}
+    try:
+        response = match.func(sub_request(request, url), *match.args,
+                              **match.kwargs)
+        body = response_body(response)
+    except Http404:
+        return {'url': url, 'status': 404,
+                'body': {'detail': 'Страница не найдена.'}}
+    except PermissionDenied:
+        return {'url': url, 'status': 403,
+                'body': {'detail': 'Недостаточно прав.'}}
+    except Exception:
+        logger.exception('Ошибка во вложенном запросе %s', url)
+        return {'url': url, 'status': 500,
+                'body': {'detail': 'Ошибка сервера.'}}
+    return {'url': url, 'status': response.status_code, 'body': body}
+
+
+def run(request, url, context):
+    try:
+        return context.run(dispatch, request, url)
+    finally:
+        connections.close_all()
+
+
+def execute(request, urls):
+    """Выполняет GET-запросы параллельно в пуле потоков; у каждого потока
+    свое соединение с БД и копия контекста исходного запроса (выбор
+    реплики)."""
+    if len(urls) == 1:
+        return [dispatch(request, urls[0])]
+    futures = [executor.submit(run, request, url,
+                               contextvars.copy_context())
+               for url in urls]
+    return [future.result() for future in futures]
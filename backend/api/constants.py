@@ -7,3 +7,43 @@ INGREDIENTS_NAME = 128
 INGREDIENTS_UNIT = 64
 USER_NAME = 20
 AMOUNT_VALIDATOR = 1
+RECOMMENDATIONS_TOP_N = 20
+RECOMMENDATIONS_CHUNK_SIZE = 1000
+CART_INTERACTION_WEIGHT = 0.5
+FEED_FANOUT_BATCH_SIZE = 1000
+CART_TOTALS_CHUNK_SIZE = 1000
+MEDIA_GC_BATCH_SIZE = 500
+MEDIA_GC_GRACE_HOURS = 24
+MEDIA_GC_WORKERS = 8
+JSONL_CHUNK_SIZE = 500
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 32
+MINHASH_SHINGLE_SIZE = 3
+DUPLICATE_SIMILARITY = 0.8
+DUPLICATES_CHUNK_SIZE = 1000
+BATCH_MAX_REQUESTS = 10
+BATCH_MAX_URL_LENGTH = 2048
+BATCH_WORKERS = 4
+PROFILE_SAMPLE_INTERVAL = 0.001
+PROFILE_MAX_QUERIES = 1000
+PROFILE_STACK_DEPTH = 8
+DELETION_BATCH_SIZE = 1000
+SYNDICATION_FEED_SIZE = 50
+SYNDICATION_MAX_AGE = 60
+SYNDICATION_CACHE_SECONDS = 3600
+SYNC_PAGE_SIZE = 500
+SYNC_SETTLE_SECONDS = 5
+SYNC_RETENTION_DAYS = 30
+SYNC_COMPACT_BATCH_SIZE = 10000
+COALESCE_LOCK_SECONDS = 10
+COALESCE_WAIT_SECONDS = 2
+COALESCE_POLL_SECONDS = 0.02
+REFERENCE_DATA_CACHE_SECONDS = 3600
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_LOCK_SECONDS = 60
+IDEMPOTENCY_WAIT_SECONDS = 5
+IDEMPOTENCY_POLL_SECONDS = 0.05
+WARMUP_PAGES = 3
+WARMUP_PAGE_LIMIT = 6
+WARMUP_POPULAR_RECIPES = 50
+WARMUP_WORKERS = 4
@@ -0,0 +1,58 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+ANY_REPLICA = object()
+
+# None — читать с основной базы; ANY_REPLICA — реплика еще не выбрана;
+# строка — реплика, закрепленная за текущим запросом.
+read_alias = ContextVar('read_alias', default=None)
+_down_until = {}
+
+
+def replica_is_up(alias):
+    return _down_until.get(alias, 0) <= time.monotonic()
+
+
+def choose_replica():
+    replicas = [alias for alias in settings.DATABASE_REPLICAS
+                if replica_is_up(alias)]
+    random.shuffle(replicas)
+    for alias in replicas:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            _down_until[alias] = (time.monotonic()
+                                  + settings.REPLICA_RETRY_SECONDS)
+            continue
+        return alias
+    return 'default'
+
+
+class ReplicaRouter:
+    """Отправляет чтения безопасных API-запросов на живую реплику.
+
+    Какие запросы читают с реплик, решает ReplicaRoutingMiddleware.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'authtoken':
+            # Только что выданный токен должен работать сразу.
+            return 'default'
+        alias = read_alias.get()
+        if alias is ANY_REPLICA:
+            alias = choose_replica()
+            read_alias.set(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
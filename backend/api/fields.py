@@ -0,0 +1,20 @@
+from rest_framework import serializers
+
+
+class Base64ImageField(serializers.ImageField):
+    """Base64ImageField из drf_extra_fields, загружаемый при первой записи.
+
+    Чтение работает как обычный ImageField, поэтому воркеры, которые
+    только отдают рецепты, не импортируют drf_extra_fields и Pillow.
+    """
+
+    def __init__(self, **kwargs):
+        self.base64_kwargs = kwargs
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        from drf_extra_fields.fields import Base64ImageField
+
+        field = Base64ImageField(**self.base64_kwargs)
+        field.bind(self.field_name, self.parent)
+        return field.to_internal_value(data)
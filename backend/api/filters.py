@@ -1,6 +1,13 @@
 import django_filters
 
-from recipes.models import Ingredients, Recipes, Tags
+from recipes.models import Ingredients, Recipes
+from recipes.registry import reference_data
+from users.models import User
+from users.search import search_users
+
+
+def tag_choices():
+    return [(tag.slug, tag.name) for tag in reference_data.get_tags()]
 
 
 class IngredientFilter(django_filters.FilterSet):
@@ -13,18 +20,48 @@ class IngredientFilter(django_filters.FilterSet):
         fields = ['name']
 
 
+class UserFilter(django_filters.FilterSet):
+    search = django_filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = User
+        fields = ['search']
+
+    def filter_search(self, queryset, name, value):
+        return search_users(queryset, value)
+
+
 class RecipeFilter(django_filters.FilterSet):
-    tags = django_filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tags.objects.all(),)
+    tags = django_filters.MultipleChoiceFilter(
+        choices=tag_choices, method='filter_tags')
+    tags_match = django_filters.ChoiceFilter(
+        choices=(('any', 'Любой из тегов'), ('all', 'Все теги')),
+        method='filter_tags_match')
+    min_cooking_time = django_filters.NumberFilter(
+        field_name='cooking_time', lookup_expr='gte')
+    max_cooking_time = django_filters.NumberFilter(
+        field_name='cooking_time', lookup_expr='lte')
     is_favorited = django_filters.NumberFilter(method='filter_is_favorited')
     is_in_shopping_cart = django_filters.NumberFilter(
         method='filter_is_in_shopping_cart')
 
     class Meta:
         model = Recipes
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['tags', 'tags_match', 'author', 'min_cooking_time',
+                  'max_cooking_time', 'is_favorited', 'is_in_shopping_cart']
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        ids = [reference_data.get_tag_by_slug(slug).id for slug in value]
+        if self.form.cleaned_data.get('tags_match') == 'all':
+            for tag_id in ids:
+                queryset = queryset.filter(tags=tag_id)
+            return queryset
+        return queryset.filter(tags__in=ids).distinct()
+
+    def filter_tags_match(self, queryset, name, value):
+        return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -35,5 +72,5 @@ class RecipeFilter(django_filters.FilterSet):
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(shopping_cart__user=user)
+            return queryset.filter(shoppingcart__user=user)
         return queryset
@@ -0,0 +1,97 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+from api.constants import (IDEMPOTENCY_KEY_MAX_LENGTH,
+                           IDEMPOTENCY_LOCK_SECONDS, IDEMPOTENCY_POLL_SECONDS,
+                           IDEMPOTENCY_WAIT_SECONDS)
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+
+class Conflict(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Запрос с этим ключом идемпотентности еще выполняется.'
+
+
+class KeyReused(exceptions.APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = ('Ключ идемпотентности уже использован '
+                      'с другим телом запроса.')
+
+
+def fingerprint(request):
+    """Хеш сырого тела: сравнение повторов без разбора JSON и base64."""
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def replay(stored):
+    response = Response(stored['data'], status=stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def wait_for(key):
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(IDEMPOTENCY_POLL_SECONDS)
+        stored = cache.get(key)
+        if stored is not None:
+            return stored
+    return None
+
+
+def execute(key, body, method, view, request, *args, **kwargs):
+    response = method(view, request, *args, **kwargs)
+    if response.status_code < 500:
+        cache.set(key, {'body': body, 'status': response.status_code,
+                        'data': response.data},
+                  settings.IDEMPOTENCY_KEY_SECONDS)
+    return response
+
+
+def idempotent(method):
+    """Запросы с заголовком Idempotency-Key выполняются один раз.
+
+    Ответ сохраняется для пользователя и ключа на IDEMPOTENCY_KEY_SECONDS;
+    повтор получает сохраненный ответ, не разбирая тело и не трогая
+    картинки. Повтор, пришедший пока первый запрос выполняется, ждет его
+    ответа, а если не дождался — получает 409.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        idempotency_key = request.META.get(HEADER)
+        if not idempotency_key:
+            return method(self, request, *args, **kwargs)
+        if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise exceptions.ValidationError(
+                {'Idempotency-Key': 'Слишком длинный ключ.'})
+        digest = hashlib.sha1(idempotency_key.encode()).hexdigest()
+        key = (f'idempotency:{request.user.pk}:{request.method}:'
+               f'{request.path}:{digest}')
+        body = fingerprint(request)
+        stored = cache.get(key)
+        if stored is None:
+            if not cache.add(key + ':lock', 1, IDEMPOTENCY_LOCK_SECONDS):
+                stored = wait_for(key)
+                if stored is None:
+                    raise Conflict
+            else:
+                try:
+                    # Первый запрос мог сохранить ответ и снять блокировку
+                    # между чтением кеша и ее захватом
+                    stored = cache.get(key)
+                    if stored is None:
+                        return execute(key, body, method, self, request,
+                                       *args, **kwargs)
+                finally:
+                    cache.delete(key + ':lock')
+        if stored['body'] != body:
+            raise KeyReused
+        return replay(stored)
+    return wrapper
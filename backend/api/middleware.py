@@ -0,0 +1,95 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from api import profiling
+from api.db_router import ANY_REPLICA, read_alias
+
+
+class RateLimitHeadersMiddleware:
+    """Отдает состояние самой исчерпанной корзины троттлинга запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit:
+            scope, limit, remaining = rate_limit
+            response['X-RateLimit-Scope'] = scope
+            response['X-RateLimit-Limit'] = limit
+            response['X-RateLimit-Remaining'] = max(remaining, 0)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Безопасные запросы к API читают с реплик, но после записи клиент
+    на PRIMARY_PIN_SECONDS закрепляется за основной базой (cookie для
+    браузера, метка в кеше для клиентов с токеном)."""
+
+    cookie_name = 'pin_primary'
+    # POST-запросы, которые только читают данные
+    read_only_paths = ('/api/batch/',)
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        if (request.method in SAFE_METHODS
+                or request.path in self.read_only_paths):
+            if (not request.path.startswith('/api/')
+                    or self.is_pinned(request)):
+                return self.get_response(request)
+            token = read_alias.set(ANY_REPLICA)
+            try:
+                return self.get_response(request)
+            finally:
+                read_alias.reset(token)
+        response = self.get_response(request)
+        if response.status_code < 400:
+            self.pin(request, response)
+        return response
+
+    def get_pin_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if authorization:
+            digest = hashlib.sha1(authorization.encode()).hexdigest()
+            return f'db:pin:{digest}'
+        return None
+
+    def is_pinned(self, request):
+        if self.cookie_name in request.COOKIES:
+            return True
+        key = self.get_pin_key(request)
+        return bool(key and cache.get(key))
+
+    def pin(self, request, response):
+        seconds = settings.PRIMARY_PIN_SECONDS
+        response.set_cookie(self.cookie_name, '1', max_age=seconds,
+                            httponly=True, samesite='Lax')
+        key = self.get_pin_key(request)
+        if key:
+            cache.set(key, 1, seconds)
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос с заголовком X-Profile или параметром _profile,
+    если его отправил сотрудник. Для остальных запросов — только проверка
+    заголовка и параметра."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if ('HTTP_X_PROFILE' not in request.META
+                and '_profile' not in request.GET):
+            return self.get_response(request)
+        user = profiling.get_staff_user(request)
+        if user is None:
+            return self.get_response(request)
+        return profiling.profile(self.get_response, request, user)
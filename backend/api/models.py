@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db import models
+
+
+class ProfileReport(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.SET_NULL, null=True,
+                             related_name='profile_reports',
+                             verbose_name='Кто запросил')
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.TextField(verbose_name='Адрес')
+    status = models.PositiveSmallIntegerField(verbose_name='Код ответа')
+    duration = models.FloatField(verbose_name='Длительность, мс')
+    samples = models.PositiveIntegerField(verbose_name='Сэмплов')
+    stacks = models.TextField(verbose_name='Стеки (folded)')
+    queries = models.JSONField(default=list, verbose_name='SQL-запросы')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата создания')
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration:.0f} мс)'
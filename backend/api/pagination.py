@@ -1,5 +1,201 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import (CursorPagination,
+                                       LimitOffsetPagination,
+                                       PageNumberPagination)
+from rest_framework.utils.urls import replace_query_param
 
-class CustomPageNumberPagination(PageNumberPagination):
+from recipes import coalescing
+
+EXACT = 'exact'
+CACHED = 'cached'
+ESTIMATED = 'estimated'
+
+
+def count_strategy(view):
+    """Стратегия подсчета для эндпоинта вида <basename>-<action>."""
+    endpoint = (f'{getattr(view, "basename", None)}-'
+                f'{getattr(view, "action", None)}')
+    return settings.PAGINATION_COUNT_STRATEGIES.get(
+        endpoint, settings.PAGINATION_COUNT_DEFAULT)
+
+
+def cached_count(queryset, versions):
+    """COUNT(*) из кеша: ключ зависит от запроса и версий списков, поэтому
+    изменение списка сбрасывает число раньше PAGINATION_COUNT_SECONDS."""
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.sha1(f'{sql}{params!r}'.encode()).hexdigest()
+    key = ':'.join(['count', *map(coalescing.list_version, versions),
+                    digest])
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_SECONDS)
+    return count
+
+
+def estimated_count(queryset):
+    """Число строк по оценке планировщика PostgreSQL или None, если
+    оценка меньше PAGINATION_ESTIMATE_THRESHOLD и точный подсчет дешев."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    rows = int(plan[0]['Plan']['Plan Rows'])
+    if rows < settings.PAGINATION_ESTIMATE_THRESHOLD:
+        return None
+    return rows
+
+
+class CountStrategyMixin:
+    """Общее число объектов считается точно, берется из кеша или из
+    оценки планировщика — по PAGINATION_COUNT_STRATEGIES для эндпоинта.
+    Не точные эндпоинты добавляют в ответ count_is_approximate."""
+    strategy = EXACT
+    versions = ()
+    approximate = False
+    more = False
+
+    def prepare(self, view):
+        self.strategy = count_strategy(view)
+        get_versions = getattr(view, 'get_count_versions', None)
+        self.versions = get_versions() if get_versions else ()
+        self.approximate = False
+        self.more = False
+
+    def count_objects(self, queryset):
+        if not isinstance(queryset, QuerySet):
+            return len(queryset)
+        if self.strategy == ESTIMATED:
+            estimate = estimated_count(queryset)
+            if estimate is not None:
+                self.approximate = True
+                return estimate
+        if self.strategy == CACHED:
+            return cached_count(queryset, self.versions)
+        return queryset.count()
+
+    def settle(self, page, start, size, count):
+        """Число объектов после выборки страницы. Неполная страница —
+        последняя, по ней известно точное число; пустая страница значит,
+        что оценка завышена и объекты кончились раньше. Полная страница при
+        оценке может быть не последней, даже если оценка говорит иное:
+        планировщик может занизить число, поэтому за ней всегда дается next."""
+        if not self.approximate:
+            return count
+        if not page:
+            self.approximate = False
+            return start
+        if len(page) < size:
+            self.approximate = False
+            return start + len(page)
+        self.more = True
+        return max(count, start + size)
+
+    def flag(self, response):
+        if self.strategy != EXACT:
+            response.data['count_is_approximate'] = self.approximate
+        return response
+
+
+class CountingPaginator(Paginator):
+    """При оценке числа номер страницы не сверяется с num_pages, а
+    страница не обрезается по count: оценка бывает занижена."""
+
+    def __init__(self, object_list, per_page, pagination):
+        super().__init__(object_list, per_page)
+        self.pagination = pagination
+
+    @cached_property
+    def count(self):
+        return self.pagination.count_objects(self.object_list)
+
+    def estimated(self):
+        return self.count and self.pagination.approximate
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.estimated() or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        if not self.estimated():
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class CustomPageNumberPagination(CountStrategyMixin, PageNumberPagination):
+    page_size_query_param = 'limit'
+
+    def django_paginator_class(self, queryset, page_size):
+        return CountingPaginator(queryset, page_size, self)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.prepare(view)
+        page = super().paginate_queryset(queryset, request, view)
+        if page is not None:
+            paginator = self.page.paginator
+            paginator.count = self.settle(
+                page, (self.page.number - 1) * paginator.per_page,
+                paginator.per_page, paginator.count)
+            # num_pages уже вычислен по оценке
+            vars(paginator).pop('num_pages', None)
+        return page
+
+    def get_next_link(self):
+        if not self.more:
+            return super().get_next_link()
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.page_query_param,
+                                   self.page.number + 1)
+
+    def get_paginated_response(self, data):
+        return self.flag(super().get_paginated_response(data))
+
+
+class CountedLimitOffsetPagination(CountStrategyMixin, LimitOffsetPagination):
+
+    def get_count(self, queryset):
+        return self.count_objects(queryset)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.prepare(view)
+        page = super().paginate_queryset(queryset, request, view)
+        if page is None:
+            return None
+        if self.approximate and self.offset > self.count:
+            # Смещение за оценкой еще не значит, что объектов там нет
+            page = list(queryset[self.offset:self.offset + self.limit])
+        self.count = self.settle(page, self.offset, self.limit, self.count)
+        return page
+
+    def get_next_link(self):
+        if not self.more:
+            return super().get_next_link()
+        url = replace_query_param(self.request.build_absolute_uri(),
+                                  self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param,
+                                   self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return self.flag(super().get_paginated_response(data))
+
+
+class FeedPagination(CursorPagination):
+    ordering = '-pub_date'
     page_size_query_param = 'limit'
@@ -0,0 +1,132 @@
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.constants import (PROFILE_MAX_QUERIES, PROFILE_SAMPLE_INTERVAL,
+                           PROFILE_STACK_DEPTH)
+from api.models import ProfileReport
+
+PROJECT_DIR = str(settings.BASE_DIR) + os.sep
+# Кадры обвязки не показываются в источниках SQL-запросов
+SKIP_FILES = (os.path.join('api', 'middleware.py'),
+              os.path.join('api', 'profiling.py'))
+
+
+def get_staff_user(request):
+    """Сотрудник из сессии или из токена: DRF аутентифицирует запрос
+    позже, уже внутри представления."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return user
+    auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(auth) != 2 or auth[0].lower() != 'token':
+        return None
+    try:
+        user, _ = TokenAuthentication().authenticate_credentials(auth[1])
+    except AuthenticationFailed:
+        return None
+    return user if user.is_staff else None
+
+
+def frame_name(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(PROJECT_DIR):
+        filename = filename[len(PROJECT_DIR):]
+    else:
+        filename = os.path.basename(filename)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(
+        ';', ':')
+
+
+class Sampler(threading.Thread):
+    """Раз в PROFILE_SAMPLE_INTERVAL снимает стек профилируемого потока
+    и считает одинаковые стеки в формате folded для flamegraph."""
+
+    def __init__(self, thread_id):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(PROFILE_SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n'
+                       for stack, count in self.stacks.most_common())
+
+
+class QueryRecorder:
+    """execute_wrapper: SQL, время и ближайшие кадры кода проекта, из
+    которых пришел запрос."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < PROFILE_MAX_QUERIES:
+                self.queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'duration': (time.perf_counter() - start) * 1000,
+                    'stack': self.origin(),
+                })
+
+    def origin(self):
+        frames = [
+            f'{frame.filename[len(PROJECT_DIR):]}:{frame.lineno} '
+            f'in {frame.name}'
+            for frame in traceback.extract_stack()[:-2]
+            if frame.filename.startswith(PROJECT_DIR)
+            and 'site-packages' not in frame.filename
+            and not frame.filename.endswith(SKIP_FILES)
+        ]
+        return frames[-PROFILE_STACK_DEPTH:]
+
+
+def profile(get_response, request, user):
+    """Выполняет запрос под профилировщиком и сохраняет отчет."""
+    sampler = Sampler(threading.get_ident())
+    recorder = QueryRecorder()
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        sampler.start()
+        try:
+            response = get_response(request)
+        finally:
+            sampler.stop()
+    duration = (time.perf_counter() - start) * 1000
+    report = ProfileReport.objects.create(
+        user=user, method=request.method, path=request.get_full_path(),
+        status=response.status_code, duration=duration,
+        samples=sum(sampler.stacks.values()), stacks=sampler.folded(),
+        queries=recorder.queries)
+    response['X-Profile-Id'] = report.id
+    return response
@@ -0,0 +1,132 @@
+"""Быстрое чтение: те же JSON, что у RecipesSerializer и UserSerializer,
+но из строк .values() без полей DRF и с заранее посчитанным префиксом
+адресов медиафайлов. Совпадение выдачи проверяет команда
+benchmark_serializers."""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Exists
+from django.utils.encoding import filepath_to_uri
+
+from recipes.models import (Favorites, RecipeIngredient, Recipes,
+                            ShoppingCart)
+from recipes.registry import reference_data
+from users.models import Subscriptions, User
+
+RECIPE_FIELDS = ('id', 'name', 'image', 'text', 'cooking_time', 'author_id')
+USER_FIELDS = ('id', 'email', 'username', 'avatar', 'first_name',
+               'last_name')
+RecipeTags = Recipes.tags.through
+
+
+def instance_row(obj, fields):
+    row = {field: getattr(obj, field) for field in fields}
+    for field in ('image', 'avatar'):
+        if field in row:
+            row[field] = row[field].name
+    return row
+
+
+def media_url(prefix, name):
+    return prefix + filepath_to_uri(name) if name else None
+
+
+def media_prefix(request):
+    return request.build_absolute_uri(settings.MEDIA_URL)
+
+
+def users(rows, user):
+    """Как UserSerializer: аватар — относительный адрес или ''."""
+    subscribed = set()
+    if user.is_authenticated:
+        subscribed = set(Subscriptions.objects.filter(
+            subscriber=user,
+            subscribed_to__in=[row['id'] for row in rows]
+        ).values_list('subscribed_to_id', flat=True))
+    return [{
+        'id': row['id'],
+        'email': row['email'],
+        'username': row['username'],
+        'avatar': media_url(settings.MEDIA_URL, row['avatar']) or '',
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'is_subscribed': row['id'] in subscribed,
+    } for row in rows]
+
+
+def recipes(rows, user, prefix):
+    """Как RecipesSerializer: связи всей страницы читаются пачкой."""
+    ids = [row['id'] for row in rows]
+    ingredients, tags = defaultdict(list), defaultdict(list)
+    for recipe_id, ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe_id__in=ids).values_list(
+                'recipe_id', 'ingredient_id', 'amount').order_by('id'):
+        ingredient = reference_data.get_ingredient(ingredient_id).as_dict()
+        ingredient['amount'] = amount
+        ingredients[recipe_id].append(ingredient)
+    for recipe_id, tag_id in RecipeTags.objects.filter(
+            recipes_id__in=ids).values_list(
+                'recipes_id', 'tags_id').order_by('id'):
+        tags[recipe_id].append(reference_data.get_tag(tag_id).as_dict())
+
+    author_ids = {row['author_id'] for row in rows}
+    authors = {author['id']: author for author in users(
+        list(User.objects.filter(id__in=author_ids).values(*USER_FIELDS)),
+        user)}
+    favorited = in_cart = set()
+    if user.is_authenticated:
+        favorited, in_cart = (set(model.objects.filter(
+            user=user, recipe_id__in=ids).values_list(
+                'recipe_id', flat=True))
+            for model in (Favorites, ShoppingCart))
+    return [{
+        'id': row['id'],
+        'ingredients': ingredients[row['id']],
+        'tags': tags[row['id']],
+        'image': media_url(prefix, row['image']),
+        'name': row['name'],
+        'text': row['text'],
+        'cooking_time': row['cooking_time'],
+        'author': authors[row['author_id']],
+        'is_favorited': row['id'] in favorited,
+        'is_in_shopping_cart': row['id'] in in_cart,
+    } for row in rows]
+
+
+def recipes_by_id(ids, user, prefix):
+    """Рецепты страницы по id в заданном порядке."""
+    rows = {row['id']: row for row in Recipes.objects.filter(
+        id__in=ids).values(*RECIPE_FIELDS)}
+    return recipes([rows[pk] for pk in ids if pk in rows], user, prefix)
+
+
+def shared_recipe(pk):
+    """Карточка рецепта, общая для всех читателей: как для анонима, но
+    в image — имя файла, адрес строит personal_recipe. None, если
+    рецепта нет."""
+    rows = list(Recipes.objects.filter(id=pk).values(*RECIPE_FIELDS))
+    if not rows:
+        return None
+    return dict(recipes(rows, AnonymousUser(), '')[0],
+                image=rows[0]['image'])
+
+
+def personal_recipe(recipe, request):
+    """Общая карточка с адресом картинки и отметками читателя; отметки
+    читаются одним запросом."""
+    data = dict(recipe, image=media_url(media_prefix(request),
+                                        recipe['image']))
+    user = request.user
+    if user.is_authenticated:
+        flags = User.objects.filter(id=user.id).annotate(
+            favorited=Exists(Favorites.objects.filter(
+                user=user, recipe_id=recipe['id'])),
+            in_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe_id=recipe['id'])),
+            subscribed=Exists(Subscriptions.objects.filter(
+                subscriber=user, subscribed_to=recipe['author']['id'])),
+        ).values_list('favorited', 'in_cart', 'subscribed').get()
+        data['is_favorited'], data['is_in_shopping_cart'] = flags[:2]
+        data['author'] = dict(recipe['author'], is_subscribed=flags[2])
+    return data
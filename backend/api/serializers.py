@@ -1,10 +1,14 @@
 from rest_framework import serializers
 from rest_framework.serializers import ValidationError
-from django.db.models import F
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 
+from api.constants import BATCH_MAX_REQUESTS, BATCH_MAX_URL_LENGTH
+from api.fields import Base64ImageField
+from api.models import ProfileReport
+from recipes import cart, usage
 from recipes.models import (Tags, Ingredients, Recipes, Favorites,
                             ShoppingCart, RecipeIngredient)
+from recipes.registry import reference_data
 from users.serializers import UserSerializer
 
 
@@ -22,7 +26,7 @@ class IngredientsSerializer(serializers.ModelSerializer):
 
 class RecipesSerializer(serializers.ModelSerializer):
     ingredients = serializers.SerializerMethodField()
-    tags = TagsSerializer(many=True, read_only=True)
+    tags = serializers.SerializerMethodField()
     author = UserSerializer(read_only=True)
     image = Base64ImageField(use_url='recipe_images', required=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
@@ -35,14 +39,17 @@ class RecipesSerializer(serializers.ModelSerializer):
                   'is_favorited', 'is_in_shopping_cart']
 
     def get_ingredients(self, obj):
-        recipe = obj
-        ingredients = recipe.ingredients.values(
-            'id',
-            'name',
-            'measurement_unit',
-            amount=F('recipeingredient__amount')
-        )
-        return ingredients
+        amounts = RecipeIngredient.objects.filter(recipe=obj).values_list(
+            'ingredient_id', 'amount').order_by('id')
+        return [
+            dict(reference_data.get_ingredient(pk).as_dict(), amount=amount)
+            for pk, amount in amounts
+        ]
+
+    def get_tags(self, obj):
+        tag_ids = Recipes.tags.through.objects.filter(
+            recipes_id=obj.id).values_list('tags_id', flat=True).order_by('id')
+        return [reference_data.get_tag(pk).as_dict() for pk in tag_ids]
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
@@ -68,7 +75,7 @@ class RecipesSerializer(serializers.ModelSerializer):
         if not ingredients:
             raise ValidationError('Список ингредиентов не может быть пустым.')
         for ingredient in ingredients:
-            if not Ingredients.objects.filter(id=ingredient['id']).exists():
+            if not reference_data.get_ingredient(ingredient['id']):
                 raise ValidationError('Ингредиента с таким id не существует.')
             if ingredient['id'] in ingredients_list:
                 raise ValidationError(
@@ -84,7 +91,7 @@ class RecipesSerializer(serializers.ModelSerializer):
         if not tags:
             raise ValidationError('Список тегов не может быть пустым.')
         for tag in tags:
-            if not Tags.objects.filter(id=tag).exists():
+            if not reference_data.get_tag(tag):
                 raise ValidationError('Тега с таким id не существует.')
             if tag in tags_list:
                 raise ValidationError(
@@ -94,29 +101,61 @@ class RecipesSerializer(serializers.ModelSerializer):
 
     def create_ingredients(self, ingredients, recipe):
         self.validate_ingredients(ingredients)
-        for ingredient in ingredients:
-            ingredient_obj = Ingredients.objects.get(id=ingredient['id'])
-            RecipeIngredient.objects.create(recipe=recipe,
-                                            ingredient=ingredient_obj,
-                                            amount=ingredient['amount'])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe,
+                             ingredient_id=ingredient['id'],
+                             amount=ingredient['amount'])
+            for ingredient in ingredients)
 
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = self.initial_data.get('tags')
         ingredients_data = self.initial_data.get('ingredients')
         recipe = Recipes.objects.create(**validated_data)
         self.create_ingredients(ingredients=ingredients_data, recipe=recipe)
+        usage.change_recipes((), cart.recipe_amounts(recipe.id).keys())
         self.validate_tags(tags_data)
         recipe.tags.set(tags_data)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = self.initial_data.get('tags')
         ingredients = self.initial_data.get('ingredients')
         self.validate_tags(tags)
         instance = super().update(instance, validated_data)
+        old_amounts = cart.recipe_amounts(instance.id)
         instance.ingredients.clear()
         self.create_ingredients(recipe=instance, ingredients=ingredients)
+        new_amounts = cart.recipe_amounts(instance.id)
+        usage.change_recipes(old_amounts.keys(), new_amounts.keys())
+        cart.change_recipe(instance.id, old_amounts, new_amounts)
         instance.tags.clear()
         instance.tags.set(tags)
         instance.save()
         return instance
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = serializers.ListField(
+        child=serializers.CharField(max_length=BATCH_MAX_URL_LENGTH),
+        allow_empty=False, max_length=BATCH_MAX_REQUESTS)
+
+    def validate_requests(self, urls):
+        for url in urls:
+            if not url.startswith('/api/') or url.startswith('/api/batch/'):
+                raise ValidationError(f'Недопустимый адрес: {url}')
+        return urls
+
+
+class ProfileReportSerializer(serializers.ModelSerializer):
+    user = serializers.StringRelatedField()
+    queries_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProfileReport
+        fields = ('id', 'user', 'method', 'path', 'status', 'duration',
+                  'samples', 'queries_count', 'created')
+
+    def get_queries_count(self, obj):
+        return len(obj.queries)
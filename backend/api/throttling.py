@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+STATS_KEY = 'throttle:stats'
+
+# Все корзины запроса проверяются и списываются одним вызовом скрипта:
+# запрос проходит, только если токен есть в каждой из них.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local count = #KEYS - 1
+local tokens = {}
+local allowed = 1
+local wait = 0
+for i = 1, count do
+    local capacity = tonumber(ARGV[3 * i - 2])
+    local rate = tonumber(ARGV[3 * i - 1])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local value = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    value = math.min(capacity, value + math.max(0, now - ts) * rate)
+    if value < 1 then
+        allowed = 0
+        wait = math.max(wait, (1 - value) / rate)
+    end
+    tokens[i] = value
+end
+local remaining = {}
+for i = 1, count do
+    local capacity = tonumber(ARGV[3 * i - 2])
+    local rate = tonumber(ARGV[3 * i - 1])
+    if allowed == 1 then
+        tokens[i] = tokens[i] - 1
+    end
+    redis.call('HSET', KEYS[i], 'tokens', tokens[i], 'ts', now)
+    redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) + 1)
+    local result = allowed == 1 and ':allowed' or ':denied'
+    redis.call('HINCRBY', KEYS[count + 1], ARGV[3 * i] .. result, 1)
+    remaining[i] = math.floor(tokens[i])
+end
+return {allowed, tostring(wait), remaining}
+"""
+
+
+def parse_rate(rate):
+    """'100/min' -> (емкость корзины, пополнение токенов в секунду)."""
+    num, period = rate.split('/')
+    seconds = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+    return int(num), int(num) / seconds
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket в общем кеше: общий лимит anon/user плюс лимит
+    throttle_scope представления, если он задан.
+
+    С django-redis обе корзины проверяются одним атомарным Lua-скриптом,
+    поэтому лимиты общие для всех воркеров и узлов. С другими бэкендами
+    кеша атомарность гарантируется только внутри процесса.
+    """
+    cache = cache
+    lock = threading.Lock()
+    script = None
+
+    def __init__(self):
+        self.rates = api_settings.DEFAULT_THROTTLE_RATES
+        self.wait_time = None
+
+    def get_buckets(self, request, view):
+        if request.user and request.user.is_authenticated:
+            scopes, ident = ['user'], request.user.pk
+        else:
+            scopes, ident = ['anon'], self.get_ident(request)
+        scopes.append(getattr(view, 'throttle_scope', None))
+        return [(scope, f'throttle:{scope}:{ident}', *parse_rate(rate))
+                for scope in scopes
+                if scope and (rate := self.rates.get(scope))]
+
+    def allow_request(self, request, view):
+        buckets = self.get_buckets(request, view)
+        if not buckets:
+            return True
+        allowed, self.wait_time, remaining = self.consume(buckets)
+        scope, _, capacity, _ = buckets[remaining.index(min(remaining))]
+        request._request.rate_limit = (scope, capacity, min(remaining))
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+    def consume(self, buckets):
+        try:
+            client = self.cache.client.get_client(write=True)
+        except AttributeError:
+            return self.consume_locally(buckets)
+        if TokenBucketThrottle.script is None:
+            TokenBucketThrottle.script = client.register_script(
+                TOKEN_BUCKET_SCRIPT)
+        keys = [self.cache.make_key(key) for _, key, _, _ in buckets]
+        args = []
+        for scope, _, capacity, rate in buckets:
+            args.extend((capacity, rate, scope))
+        allowed, wait, remaining = self.script(
+            keys=keys + [self.cache.make_key(STATS_KEY)], args=args,
+            client=client)
+        return bool(allowed), float(wait), [int(x) for x in remaining]
+
+    def consume_locally(self, buckets):
+        with self.lock:
+            now = time.time()
+            keys = [key for _, key, _, _ in buckets]
+            states = self.cache.get_many(keys + [STATS_KEY])
+            stats = states.get(STATS_KEY, {})
+            tokens, wait = [], 0
+            for _, key, capacity, rate in buckets:
+                value, ts = states.get(key, (capacity, now))
+                value = min(capacity, value + max(0, now - ts) * rate)
+                if value < 1:
+                    wait = max(wait, (1 - value) / rate)
+                tokens.append(value)
+            allowed = not wait
+            updates = {}
+            for value, (scope, key, capacity, rate) in zip(tokens, buckets):
+                updates[key] = (value - allowed, now)
+                result = 'allowed' if allowed else 'denied'
+                stats[f'{scope}:{result}'] = stats.get(
+                    f'{scope}:{result}', 0) + 1
+            self.cache.set_many(updates, timeout=math.ceil(
+                max(capacity / rate for _, _, capacity, rate in buckets)) + 1)
+            self.cache.set(STATS_KEY, stats, timeout=None)
+            return allowed, wait, [math.floor(value - allowed)
+                                   for value in tokens]
+
+
+def get_stats():
+    try:
+        client = cache.client.get_client()
+    except AttributeError:
+        return cache.get(STATS_KEY, {})
+    return {key.decode(): int(value) for key, value in
+            client.hgetall(cache.make_key(STATS_KEY)).items()}
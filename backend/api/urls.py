@@ -1,8 +1,10 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
-from api.views import TagsViewSet, IngredientsViewSet, RecipesViewSet
-from users.views import UserViewSet
+from api.views import (TagsViewSet, IngredientsViewSet, RecipesViewSet,
+                       BatchView, ProfileReportViewSet, SyncView,
+                       syndication_feed)
+from users.views import TokenCreateView, UserViewSet
 
 
 app_name = 'api'
@@ -12,9 +14,17 @@ router_v1.register(r'users', UserViewSet, basename='users')
 router_v1.register(r'tags', TagsViewSet, basename='tags')
 router_v1.register(r'ingredients', IngredientsViewSet, basename='ingredients')
 router_v1.register(r'recipes', RecipesViewSet, basename='recipes')
+router_v1.register(r'profiles', ProfileReportViewSet, basename='profiles')
 
 urlpatterns = [
     path('', include(router_v1.urls)),
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    re_path(r'^feeds/recipes\.(?P<format>rss|atom)$', syndication_feed,
+            name='feed'),
+    re_path(r'^feeds/authors/(?P<author_id>\d+)\.(?P<format>rss|atom)$',
+            syndication_feed, name='author-feed'),
+    path('auth/token/login/', TokenCreateView.as_view(), name='login'),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,23 +1,39 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
-from rest_framework.pagination import LimitOffsetPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import (AllowAny, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import status, exceptions
 from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
 import shortuuid
 
 from recipes.models import (Tags, Ingredients, Recipes, ShoppingCart,
-                            Favorites, RecipeIngredient)
+                            Favorites, ChangeLogEntry)
 from api.permissions import IsAuthenticatedOrReadOnly
 from api.serializers import (TagsSerializer, IngredientsSerializer,
-                             RecipesSerializer)
+                             RecipesSerializer, BatchSerializer,
+                             ProfileReportSerializer)
 from users.serializers import ShortRecipeSerializer
 from api.filters import IngredientFilter, RecipeFilter
+from api.pagination import CountedLimitOffsetPagination, FeedPagination
+from api import batch, representations
+from api.idempotency import idempotent
+from api.models import ProfileReport
+from api.constants import JSONL_CHUNK_SIZE, SYNDICATION_MAX_AGE
+from recipes import (bitmap, cart, changelog, coalescing, deletion,
+                     syndication, usage)
+from recipes.feed import feed_queryset, feed_recipes
+from recipes.jsonl import dumps, iter_records
+from recipes.registry import reference_data, to_id
 
 
 class TagsViewSet(ReadOnlyModelViewSet):
@@ -25,6 +41,15 @@ class TagsViewSet(ReadOnlyModelViewSet):
     serializer_class = TagsSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return Response([tag.as_dict() for tag in reference_data.get_tags()])
+
+    def retrieve(self, request, pk):
+        tag = reference_data.get_tag(pk)
+        if tag is None:
+            raise Http404
+        return Response(tag.as_dict())
+
 
 class IngredientsViewSet(ReadOnlyModelViewSet):
     queryset = Ingredients.objects.all()
@@ -34,14 +59,89 @@ class IngredientsViewSet(ReadOnlyModelViewSet):
     search_fields = ['name']
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        ingredients = reference_data.find_ingredients(
+            prefix=request.query_params.get('name', ''),
+            search=request.query_params.get('search', ''))
+        if request.query_params.get('ordering') == 'popularity':
+            ingredients = usage.by_popularity(ingredients)
+        return Response([ingredient.as_dict() for ingredient in ingredients])
+
+    def retrieve(self, request, pk):
+        ingredient = reference_data.get_ingredient(pk)
+        if ingredient is None:
+            raise Http404
+        return Response(ingredient.as_dict())
+
 
 class RecipesViewSet(ModelViewSet):
     queryset = Recipes.objects.all()
     serializer_class = RecipesSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = CountedLimitOffsetPagination
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    throttle_scope = None
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return self.paginated_list(request)
+        return Response(coalescing.get_or_compute(
+            coalescing.recipe_list_key(request),
+            lambda: self.paginated_list(request).data,
+            settings.RECIPE_LIST_SECONDS))
+
+    def paginated_list(self, request):
+        if not bitmap.bitmap_enabled():
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(
+                queryset.values(*representations.RECIPE_FIELDS))
+            return self.get_paginated_response(self.represent(page))
+        filterset = RecipeFilter(request.query_params,
+                                 queryset=self.get_queryset(),
+                                 request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        ids = bitmap.search(request.user, filterset.form.cleaned_data)
+        page = [int(pk) for pk in self.paginate_queryset(ids)]
+        return self.get_paginated_response(
+            representations.recipes_by_id(
+                page, request.user, representations.media_prefix(request)))
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = to_id(kwargs['pk'])
+        recipe = coalescing.get_or_compute(
+            coalescing.RECIPE_DETAIL_KEY.format(pk),
+            lambda: representations.shared_recipe(pk),
+            settings.RECIPE_DETAIL_FRESH_SECONDS,
+            settings.RECIPE_DETAIL_STALE_SECONDS)
+        if recipe is None:
+            raise Http404
+        return Response(representations.personal_recipe(recipe, request))
+
+    def get_count_versions(self):
+        versions = [coalescing.RECIPE_LIST]
+        if self.request.user.is_authenticated:
+            versions.append(
+                coalescing.USER_LISTS.format(self.request.user.pk))
+        return versions
+
+    def represent(self, rows):
+        return representations.recipes(
+            rows, self.request.user,
+            representations.media_prefix(self.request))
+
+    def perform_destroy(self, instance):
+        deletion.hide_recipe(instance)
+
+    def get_throttles(self):
+        if self.action in ('create', 'update', 'partial_update'):
+            self.throttle_scope = 'uploads'
+        return super().get_throttles()
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -51,6 +151,7 @@ class RecipesViewSet(ModelViewSet):
         context['request'] = self.request
         return context
 
+    @transaction.atomic
     def add_method(self, request, model, recipe):
         user = self.request.user
         if model.objects.filter(user=user, recipe=recipe).exists():
@@ -60,6 +161,7 @@ class RecipesViewSet(ModelViewSet):
         serializer = ShortRecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def delete_method(self, request, model, recipe):
         user = self.request.user
         try:
@@ -88,7 +190,27 @@ class RecipesViewSet(ModelViewSet):
         elif request.method == 'DELETE':
             return self.delete_method(request, Favorites, recipe)
 
-    @action(detail=True, methods=['GET'], url_path='get-link')
+    @action(detail=False, methods=['GET'],
+            permission_classes=[IsAuthenticated],
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        page = self.paginate_queryset(feed_queryset(request.user))
+        rows = [representations.instance_row(
+            recipe, representations.RECIPE_FIELDS)
+            for recipe in feed_recipes(page)]
+        return self.get_paginated_response(self.represent(rows))
+
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipes, pk=pk)
+        queryset = Recipes.objects.filter(
+            similar_to__recipe=recipe).order_by('-similar_to__score')
+        page = self.paginate_queryset(queryset)
+        serializer = ShortRecipeSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['GET'], url_path='get-link',
+            throttle_scope='get_link')
     def get_short_link(self, request, *args, **kwargs):
         short_uuid = shortuuid.uuid()[:6]
         base_url = 'http://localhost/'
@@ -98,29 +220,137 @@ class RecipesViewSet(ModelViewSet):
         }
         return Response(data, status=status.HTTP_200_OK)
 
+    def get_cart_ingredients(self, user):
+        return cart.summary(user)
+
     @action(detail=False, methods=['GET'],
             permission_classes=[IsAuthenticated])
+    def shopping_cart_summary(self, request):
+        return Response(self.get_cart_ingredients(request.user))
+
+    @action(detail=False, methods=['GET'],
+            permission_classes=[IsAuthenticated],
+            throttle_scope='shopping_cart')
     def download_shopping_cart(self, request):
         user = request.user
-        try:
-            ShoppingCart.objects.get(user=user)
-        except ShoppingCart.DoesNotExist:
+        ingredients = self.get_cart_ingredients(user)
+        if not ingredients:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shoppingcart__user=user).values(
-                'ingredient__name',
-                'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-
         shopping_list = 'Cписок покупок:\n\n'
         for ingredient in ingredients:
             shopping_list += '\n'.join([
-                f'{ingredient["ingredient__name"]} - {ingredient["amount"]}'
-                f'{ingredient["ingredient__measurement_unit"]}\n'
+                f'{ingredient["name"]} - {ingredient["amount"]}'
+                f'{ingredient["measurement_unit"]}\n'
             ])
 
         filename = f'{user.username}_shopping_list.txt'
         response = HttpResponse(shopping_list, content_type='text/plain')
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
+
+    @action(detail=False, methods=['GET'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        records = iter_records(self.filter_queryset(self.get_queryset()),
+                               JSONL_CHUNK_SIZE)
+        response = StreamingHttpResponse(
+            (dumps(record) for record in records),
+            content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename=recipes.jsonl'
+        return response
+
+
+class BatchView(APIView):
+    """Несколько GET-запросов к API за один HTTP-запрос."""
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(batch.execute(
+            request, serializer.validated_data['requests']))
+
+
+class ProfileReportViewSet(ReadOnlyModelViewSet):
+    queryset = ProfileReport.objects.select_related('user')
+    serializer_class = ProfileReportSerializer
+    permission_classes = [IsAdminUser]
+
+    @action(detail=True, methods=['GET'])
+    def flamegraph(self, request, pk):
+        report = self.get_object()
+        response = HttpResponse(report.stacks, content_type='text/plain')
+        response['Content-Disposition'] = (
+            f'attachment; filename="profile-{report.id}.folded"')
+        return response
+
+    @action(detail=True, methods=['GET'])
+    def queries(self, request, pk):
+        return Response(self.get_object().queries)
+
+
+class SyncView(APIView):
+    """Изменения рецептов, избранного и списка покупок после токена
+    since. Без since возвращает только текущий токен."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', -1))
+        except ValueError:
+            raise exceptions.ValidationError({'since': 'Неверный токен.'})
+        if since < 0:
+            return Response({'token': str(changelog.settled_seq())})
+        try:
+            entries, token, has_more = changelog.changes(
+                request.user.id, since)
+        except changelog.TokenExpired:
+            return Response(
+                {'detail': 'Токен устарел, загрузите данные заново.'},
+                status=status.HTTP_410_GONE)
+        data = {
+            'token': str(token),
+            'has_more': has_more,
+            'recipes': {'updated': [], 'deleted': []},
+            'favorites': {'added': [], 'removed': []},
+            'shopping_cart': {'added': [], 'removed': []},
+        }
+        lists = {ChangeLogEntry.FAVORITE: data['favorites'],
+                 ChangeLogEntry.CART: data['shopping_cart']}
+        updated = []
+        for entry in entries:
+            upsert = entry.action == ChangeLogEntry.UPSERT
+            if entry.kind == ChangeLogEntry.RECIPE:
+                if upsert:
+                    updated.append(entry.object_id)
+                else:
+                    data['recipes']['deleted'].append(entry.object_id)
+            else:
+                lists[entry.kind]['added' if upsert else 'removed'].append(
+                    entry.object_id)
+        recipes = Recipes.objects.filter(id__in=updated).select_related(
+            'author')
+        data['recipes']['updated'] = RecipesSerializer(
+            recipes, many=True, context={'request': request}).data
+        data['recipes']['deleted'].extend(
+            set(updated) - {recipe['id']
+                            for recipe in data['recipes']['updated']})
+        return Response(data)
+
+
+def syndication_feed(request, format, author_id=None):
+    """RSS/Atom всего сайта или автора из заранее собранной ленты:
+    опрос не делает запросов к базе, пока лента не изменилась."""
+    feed = syndication.get_feed(author_id)
+    if feed is None:
+        raise Http404
+    body, etag, content_type = feed['blobs'][format]
+    last_modified = int(feed['updated'].timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(body, content_type=content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=SYNDICATION_MAX_AGE)
+    return response
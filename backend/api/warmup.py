@@ -0,0 +1,24 @@
+import importlib
+
+from django.contrib.auth.password_validation import (
+    get_default_password_validators)
+from django.db import connections
+from django.urls import get_resolver
+
+# Модули, которые воркеры иначе загрузили бы лениво при первой записи.
+WRITE_PATH_MODULES = (
+    'PIL.Image',
+    'PIL.PngImagePlugin',
+    'PIL.JpegImagePlugin',
+    'drf_extra_fields.fields',
+    'recipes.minhash',
+)
+
+
+def warmup():
+    """Прогревает приложение в мастер-процессе gunicorn перед fork."""
+    for module in WRITE_PATH_MODULES:
+        importlib.import_module(module)
+    get_resolver().url_patterns
+    get_default_password_validators()
+    connections.close_all()
@@ -33,12 +33,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.RateLimitHeadersMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram_backend.urls'
@@ -72,6 +75,33 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: DB_REPLICA_HOSTS=replica1,replica2:5433
+for index, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))):
+    host, _, port = replica.partition(':')
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'], HOST=host,
+        PORT=port or DATABASES['default']['PORT'],
+        TEST={'MIRROR': 'default'})
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+PRIMARY_PIN_SECONDS = int(os.getenv('PRIMARY_PIN_SECONDS', 10))
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', 30))
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -81,13 +111,27 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+        'NAME': 'users.validators.CommonPasswordValidator',
     },
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
 ]
 
+# Хешер новых паролей (argon2 и bcrypt_sha256 требуют argon2-cffi и bcrypt)
+# и число итераций PBKDF2; хеши старого вида пересчитываются при входе
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2_sha256')
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.getenv('PASSWORD_PBKDF2_ITERATIONS', 260000))
+PASSWORD_HASHERS = {
+    'pbkdf2_sha256': 'users.hashers.PBKDF2PasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt_sha256': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = ([PASSWORD_HASHERS.pop(PASSWORD_HASHER)]
+                    + list(PASSWORD_HASHERS.values()))
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -104,6 +148,8 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
@@ -123,4 +169,67 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 5,
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_THROTTLE_CLASSES': ['api.throttling.TokenBucketThrottle'],
+    # Перед бэкендом один nginx: адрес клиента — последний в X-Forwarded-For
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('THROTTLE_ANON', '120/min'),
+        'user': os.getenv('THROTTLE_USER', '600/min'),
+        'login': os.getenv('THROTTLE_LOGIN', '10/min'),
+        'registration': os.getenv('THROTTLE_REGISTRATION', '5/hour'),
+        'uploads': os.getenv('THROTTLE_UPLOADS', '30/hour'),
+        'shopping_cart': os.getenv('THROTTLE_SHOPPING_CART', '20/min'),
+        'get_link': os.getenv('THROTTLE_GET_LINK', '30/min'),
+    },
 }
+
+# Адрес сайта для абсолютных ссылок в RSS/Atom
+SITE_URL = os.getenv('SITE_URL', 'http://localhost').rstrip('/')
+
+# Как часто воркер сверяет версию справочников тегов и ингредиентов
+REFERENCE_DATA_CHECK_SECONDS = float(
+    os.getenv('REFERENCE_DATA_CHECK_SECONDS', 1))
+
+# Промах кеша чтения пересчитывает один процесс, остальные ждут его
+# или отдают устаревшую копию
+READ_COALESCING = os.getenv('READ_COALESCING', 'true').lower() == 'true'
+
+# Сколько секунд карточка рецепта в кеше свежая и сколько еще отдается
+# устаревшей, пока ее пересчитывают
+RECIPE_DETAIL_FRESH_SECONDS = float(
+    os.getenv('RECIPE_DETAIL_FRESH_SECONDS', 30))
+RECIPE_DETAIL_STALE_SECONDS = float(
+    os.getenv('RECIPE_DETAIL_STALE_SECONDS', 300))
+
+# Сколько секунд хранятся страницы списка рецептов для анонимов
+RECIPE_LIST_SECONDS = float(os.getenv('RECIPE_LIST_SECONDS', 60))
+
+# Как считать общее число объектов в списках: exact — COUNT(*) на каждой
+# странице, cached — COUNT(*) из кеша до изменения списка, estimated —
+# оценка планировщика PostgreSQL, если она не меньше порога. Задается для
+# эндпоинтов <basename>-<action> через запятую: recipes-list=estimated
+PAGINATION_COUNT_DEFAULT = os.getenv('PAGINATION_COUNT_DEFAULT', 'exact')
+PAGINATION_COUNT_STRATEGIES = dict(
+    item.strip().split('=', 1) for item in os.getenv(
+        'PAGINATION_COUNT_STRATEGIES',
+        'recipes-list=estimated,users-list=cached,users-subscriptions=cached'
+    ).split(',') if item.strip())
+PAGINATION_COUNT_SECONDS = float(os.getenv('PAGINATION_COUNT_SECONDS', 30))
+PAGINATION_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_ESTIMATE_THRESHOLD', 10000))
+
+# Сколько секунд хранится ответ на запрос с заголовком Idempotency-Key
+IDEMPOTENCY_KEY_SECONDS = int(os.getenv('IDEMPOTENCY_KEY_SECONDS', 86400))
+
+# table — статистика ингредиентов в таблице с пересчетом при изменениях,
+# matview — материализованное представление PostgreSQL, обновляемое
+# командой refresh_ingredient_usage
+INGREDIENT_USAGE_STORAGE = os.getenv('INGREDIENT_USAGE_STORAGE', 'table')
+
+# query — один запрос по подпискам, timeline — лента, заполняемая при записи
+RECIPES_FEED_BACKEND = os.getenv('RECIPES_FEED_BACKEND', 'query')
+
+# sql — фильтры списка рецептов запросом, bitmap — индексом в памяти воркера
+RECIPES_FILTER_ENGINE = os.getenv('RECIPES_FILTER_ENGINE', 'sql')
+RECIPES_FILTER_CHECK_SECONDS = float(
+    os.getenv('RECIPES_FILTER_CHECK_SECONDS', 1))
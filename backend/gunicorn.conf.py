@@ -0,0 +1,37 @@
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8080')
+workers = int(os.getenv('GUNICORN_WORKERS',
+                        multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+# Приложение импортируется один раз в мастере, воркеры получают его
+# через fork и делят страницы памяти, пока не изменят их.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+# Заполнить кеши командой warm_caches до того, как воркеры примут трафик
+warm_caches = os.getenv('WARM_CACHES_ON_START', 'false').lower() == 'true'
+
+
+def when_ready(server):
+    if warm_caches:
+        import django
+        from django.core.management import call_command
+        from django.db import connections
+
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                              'foodgram_backend.settings')
+        django.setup()
+        call_command('warm_caches')
+        connections.close_all()
+    if not preload_app:
+        return
+    from api.warmup import warmup
+
+    warmup()
+    # Объекты, созданные до fork, исключаются из сборки мусора, иначе
+    # обход GC в воркере трогает их заголовки и копирует страницы.
+    gc.freeze()
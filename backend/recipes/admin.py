@@ -1,17 +1,57 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.db.models import Count
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce
 
+from recipes import cart, deletion, usage
 from recipes.models import (Tags, Ingredients, Recipes,
-                            Favorites, ShoppingCart, RecipeIngredient)
+                            Favorites, ShoppingCart, RecipeIngredient,
+                            RecipeDuplicate, DeletionJob)
 from users.models import User, Subscriptions
+from users.search import search_users
+
+
+class DeferredDeletionMixin:
+    """Удаление скрывает объект и ставит задачу process_deletions, а не
+    удаляет все связанные строки в запросе админки."""
+    hide = None
+
+    def get_deleted_objects(self, objs, request):
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        self.hide(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.hide(obj)
+
+
+class UserChangeList(ChangeList):
+    """При поиске сначала точные совпадения, затем по началу поля,
+    если не выбрана сортировка по колонке."""
+
+    def get_ordering(self, request, queryset):
+        ordering = super().get_ordering(request, queryset)
+        if ('search_rank' in queryset.query.annotations
+                and ORDER_VAR not in self.params):
+            return ['search_rank', 'username_lower', *ordering]
+        return ordering
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(DeferredDeletionMixin, BaseUserAdmin):
     list_display = ('email', 'username', 'first_name', 'last_name', 'avatar',
                     'subscribers_count', 'recipes_count')
     search_fields = ('email', 'username')
+    hide = staticmethod(deletion.hide_user)
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_users(queryset, search_term), False
+
+    def get_changelist(self, request, **kwargs):
+        return UserChangeList
 
     @admin.display(description='Количество подписчиков')
     def subscribers_count(self, obj):
@@ -30,9 +70,23 @@ class TagsAdmin(admin.ModelAdmin):
 
 @admin.register(Ingredients)
 class IngredientsAdmin(admin.ModelAdmin):
-    list_display = ('name', 'measurement_unit')
+    list_display = ('name', 'measurement_unit', 'recipes_count',
+                    'carts_count')
     search_fields = ('name',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_count=Coalesce(F('usage__recipes_count'), Value(0)),
+            carts_count=Coalesce(F('usage__carts_count'), Value(0)))
+
+    @admin.display(description='Рецептов', ordering='recipes_count')
+    def recipes_count(self, obj):
+        return obj.recipes_count
+
+    @admin.display(description='Списков покупок', ordering='carts_count')
+    def carts_count(self, obj):
+        return obj.carts_count
+
 
 @admin.register(Subscriptions)
 class SubscriptionsAdmin(admin.ModelAdmin):
@@ -49,12 +103,26 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
 
 
+@admin.register(RecipeDuplicate)
+class RecipeDuplicateAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'original', 'similarity')
+    list_select_related = ('recipe', 'original')
+    ordering = ('-similarity',)
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'status', 'step', 'deleted',
+                    'created', 'finished')
+    list_filter = ('kind', 'status')
+
+
 class IngredientInLine(admin.TabularInline):
     model = RecipeIngredient
 
 
 @admin.register(Recipes)
-class RecipesAdmin(admin.ModelAdmin):
+class RecipesAdmin(DeferredDeletionMixin, admin.ModelAdmin):
     list_display = ('author', 'display_ingredients', 'display_tags', 'image',
                     'name', 'text', 'cooking_time', 'pub_date')
     search_fields = ('author', 'name',)
@@ -63,6 +131,17 @@ class RecipesAdmin(admin.ModelAdmin):
     inlines = [
         IngredientInLine,
     ]
+    hide = staticmethod(deletion.hide_recipe)
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not RecipeIngredient:
+            return super().save_formset(request, form, formset, change)
+        recipe_id = form.instance.pk
+        old_amounts = cart.recipe_amounts(recipe_id)
+        super().save_formset(request, form, formset, change)
+        new_amounts = cart.recipe_amounts(recipe_id)
+        usage.change_recipes(old_amounts.keys(), new_amounts.keys())
+        cart.change_recipe(recipe_id, old_amounts, new_amounts)
 
     @admin.display(description='Количество добавлений в избранное')
     def total_favorites_count(self, obj):
@@ -0,0 +1,179 @@
+import threading
+import time
+
+from django.conf import settings
+
+from recipes import changelog
+from recipes.models import ChangeLogEntry, Favorites, Recipes, ShoppingCart
+from recipes.registry import reference_data
+
+SQL = 'sql'
+BITMAP = 'bitmap'
+RecipeTags = Recipes.tags.through
+
+
+def bitmap_enabled():
+    return settings.RECIPES_FILTER_ENGINE == BITMAP
+
+
+class RecipeIndex:
+    """Индекс видимых рецептов в памяти воркера для фильтров списка.
+
+    Позиции упорядочены как выдача (-pub_date, -id); для каждого тега
+    хранится упакованная битовая карта позиций, для времени
+    приготовления — отсортированный массив. Фильтр — побитовые операции
+    над картами, результат — id рецептов в порядке выдачи. Изменения
+    подтягиваются из журнала изменений рецептов.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.seq = None
+        self.checked = 0
+        self.rows = {}
+        self.recipe_tags = {}
+
+    def refresh(self):
+        now = time.monotonic()
+        if (self.seq is not None and now - self.checked
+                < settings.RECIPES_FILTER_CHECK_SECONDS):
+            return
+        with self.lock:
+            if self.seq is None or self.seq < changelog.floor_seq():
+                self.load()
+            else:
+                self.apply_changes()
+            self.checked = now
+
+    def load(self):
+        self.seq = changelog.settled_seq()
+        self.rows, self.recipe_tags = {}, {}
+        self.fetch(Recipes.objects.all())
+        self.build()
+
+    def apply_changes(self):
+        """Записи новее settled_seq применяются сразу, но номер
+        сдвигается только до settled_seq: запоздавшие транзакции с
+        меньшими номерами будут прочитаны при следующей проверке."""
+        settled = changelog.settled_seq()
+        changed = set(ChangeLogEntry.objects.filter(
+            kind=ChangeLogEntry.RECIPE, seq__gt=self.seq
+        ).values_list('object_id', flat=True))
+        self.seq = max(self.seq, settled)
+        if not changed:
+            return
+        for recipe_id in changed:
+            self.rows.pop(recipe_id, None)
+            self.recipe_tags.pop(recipe_id, None)
+        self.fetch(Recipes.objects.filter(id__in=changed))
+        self.build()
+
+    def fetch(self, recipes):
+        for recipe_id, author_id, cooking_time, pub_date in (
+                recipes.values_list('id', 'author_id', 'cooking_time',
+                                    'pub_date').order_by().iterator()):
+            self.rows[recipe_id] = (author_id, cooking_time,
+                                    pub_date.timestamp())
+        for recipe_id, tag_id in RecipeTags.objects.filter(
+                recipes__in=recipes.values('id')).values_list(
+                    'recipes_id', 'tags_id').iterator():
+            if recipe_id in self.rows:
+                self.recipe_tags.setdefault(recipe_id, []).append(tag_id)
+
+    def build(self):
+        self.snapshot = Snapshot(self.rows, self.recipe_tags)
+
+    def search(self, tags=(), match_all=False, author_id=None,
+               min_time=None, max_time=None, only_ids=None):
+        """id рецептов, прошедших все фильтры, в порядке выдачи."""
+        self.refresh()
+        return self.snapshot.search(tags, match_all, author_id, min_time,
+                                    max_time, only_ids)
+
+
+class Snapshot:
+    """Неизменяемые массивы индекса: обновление собирает новый снимок и
+    подменяет его целиком, не мешая идущим поискам.
+
+    numpy импортируется только здесь: при RECIPES_FILTER_ENGINE=sql
+    воркеры его не загружают.
+    """
+
+    def __init__(self, rows, recipe_tags):
+        import numpy as np
+
+        count = len(rows)
+        ids = np.fromiter(rows, dtype=np.int64, count=count)
+        values = np.array(list(rows.values()),
+                          dtype=np.float64).reshape(count, 3)
+        order = np.lexsort((-ids, -values[:, 2]))
+        self.ids = ids[order]
+        self.authors = values[order, 0].astype(np.int64)
+        times = values[order, 1].astype(np.int32)
+        self.by_time = np.argsort(times, kind='stable')
+        self.sorted_times = times[self.by_time]
+
+        pairs = np.array([(recipe_id, tag_id)
+                          for recipe_id, tags in recipe_tags.items()
+                          for tag_id in tags],
+                         dtype=np.int64).reshape(-1, 2)
+        by_id = np.argsort(self.ids)
+        positions = by_id[np.searchsorted(self.ids, pairs[:, 0],
+                                          sorter=by_id)]
+        self.tags = {int(tag_id): self.from_positions(
+            positions[pairs[:, 1] == tag_id])
+            for tag_id in np.unique(pairs[:, 1])}
+
+    def from_positions(self, positions):
+        import numpy as np
+
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[positions] = True
+        return np.packbits(mask)
+
+    def search(self, tags, match_all, author_id, min_time, max_time,
+               only_ids):
+        import numpy as np
+
+        bitmap = np.packbits(np.ones(len(self.ids), dtype=bool))
+        if tags:
+            empty = np.zeros_like(bitmap)
+            reduce = np.bitwise_and if match_all else np.bitwise_or
+            bitmap &= reduce.reduce([self.tags.get(tag_id, empty)
+                                     for tag_id in tags])
+        if author_id is not None:
+            bitmap &= np.packbits(self.authors == author_id)
+        if min_time is not None or max_time is not None:
+            start = (0 if min_time is None else np.searchsorted(
+                self.sorted_times, float(min_time), 'left'))
+            end = (len(self.ids) if max_time is None else np.searchsorted(
+                self.sorted_times, float(max_time), 'right'))
+            bitmap &= self.from_positions(self.by_time[start:end])
+        if only_ids is not None:
+            bitmap &= np.packbits(np.isin(self.ids, list(only_ids)))
+        mask = np.unpackbits(bitmap, count=len(self.ids)).astype(bool)
+        return self.ids[mask]
+
+
+recipe_index = RecipeIndex()
+
+
+def search(user, data):
+    """Фильтры RecipeFilter (очищенные данные формы) через индекс."""
+    only_ids = None
+    for flag, model in (('is_favorited', Favorites),
+                        ('is_in_shopping_cart', ShoppingCart)):
+        if data.get(flag) and user.is_authenticated:
+            ids = set(model.objects.filter(user=user).values_list(
+                'recipe_id', flat=True))
+            only_ids = ids if only_ids is None else only_ids & ids
+    author = data.get('author')
+    return recipe_index.search(
+        tags=[reference_data.get_tag_by_slug(slug).id
+              for slug in data.get('tags') or ()],
+        match_all=data.get('tags_match') == 'all',
+        author_id=author.id if author else None,
+        min_time=data.get('min_cooking_time'),
+        max_time=data.get('max_cooking_time'),
+        only_ids=only_ids)
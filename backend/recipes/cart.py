@@ -0,0 +1,112 @@
+from collections import Counter
+
+from django.db.models import F, Sum
+
+from api.constants import CART_TOTALS_CHUNK_SIZE
+from recipes import usage
+from recipes.models import (CartIngredient, Ingredients, RecipeIngredient,
+                            ShoppingCart)
+
+
+def recipe_amounts(recipe_id):
+    return Counter(dict(RecipeIngredient.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', 'amount')))
+
+
+def apply(user_ids, deltas):
+    """Прибавляет deltas {ingredient_id: amount} к итогам корзин user_ids.
+
+    Вызывать внутри транзакции, изменяющей корзину или рецепт.
+    """
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not user_ids or not deltas:
+        return
+    rows = CartIngredient.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas)
+    CartIngredient.objects.bulk_create(
+        [CartIngredient(user_id=user_id, ingredient_id=ingredient_id)
+         for user_id in user_ids for ingredient_id in deltas],
+        ignore_conflicts=True)
+    # Сохраненные строки не бывают нулевыми: с нулем только что вставленные
+    created = Counter(rows.filter(amount=0).values_list(
+        'ingredient_id', flat=True))
+    for ingredient_id, delta in deltas.items():
+        rows.filter(ingredient_id=ingredient_id).update(
+            amount=F('amount') + delta)
+    empty = rows.filter(amount__lte=0)
+    deleted = Counter(empty.values_list('ingredient_id', flat=True))
+    empty.delete()
+    created.subtract(deleted)
+    usage.add(carts=created)
+
+
+def add_recipe(user_id, recipe_id):
+    apply([user_id], recipe_amounts(recipe_id))
+
+
+def remove_recipe(user_id, recipe_id):
+    amounts = recipe_amounts(recipe_id)
+    apply([user_id], {key: -value for key, value in amounts.items()})
+
+
+def change_recipe(recipe_id, old_amounts, new_amounts):
+    """Переносит правку ингредиентов рецепта во все корзины с ним."""
+    deltas = Counter(new_amounts)
+    deltas.subtract(old_amounts)
+    users = ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+        'user_id', flat=True).order_by('user_id')
+    user_ids = list(users[:CART_TOTALS_CHUNK_SIZE])
+    while user_ids:
+        apply(user_ids, deltas)
+        user_ids = list(users.filter(
+            user_id__gt=user_ids[-1])[:CART_TOTALS_CHUNK_SIZE])
+
+
+def summary(user):
+    """Ингредиенты корзины для показа. Скрытый рецепт вычитается из
+    итогов, только когда process_deletions удаляет строки корзины с ним;
+    до этого итоги пользователя с таким рецептом считаются по видимым
+    рецептам."""
+    if ShoppingCart.objects.filter(user=user,
+                                   recipe__is_hidden=True).exists():
+        return Ingredients.objects.filter(
+            recipeingredient__recipe__shoppingcart__user=user,
+            recipeingredient__recipe__is_hidden=False
+        ).values('id', 'name', 'measurement_unit').annotate(
+            amount=Sum('recipeingredient__amount')).order_by('name')
+    return Ingredients.objects.filter(cartingredient__user=user).values(
+        'id',
+        'name',
+        'measurement_unit',
+        amount=F('cartingredient__amount')
+    ).order_by('name')
+
+
+def expected_totals(user_ids):
+    rows = RecipeIngredient.objects.filter(
+        recipe__shoppingcart__user_id__in=user_ids
+    ).values_list('recipe__shoppingcart__user_id', 'ingredient_id').annotate(
+        total=Sum('amount')).order_by()
+    return {(user_id, ingredient_id): total
+            for user_id, ingredient_id, total in rows}
+
+
+def actual_totals(user_ids):
+    rows = CartIngredient.objects.filter(user_id__in=user_ids).values_list(
+        'user_id', 'ingredient_id', 'amount')
+    return {(user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in rows}
+
+
+def rebuild(user_ids, totals=None):
+    if totals is None:
+        totals = expected_totals(user_ids)
+    old = CartIngredient.objects.filter(user_id__in=user_ids)
+    deltas = Counter(ingredient_id for _, ingredient_id in totals)
+    deltas.subtract(old.values_list('ingredient_id', flat=True))
+    old.delete()
+    usage.add(carts=deltas)
+    CartIngredient.objects.bulk_create(
+        CartIngredient(user_id=user_id, ingredient_id=ingredient_id,
+                       amount=amount)
+        for (user_id, ingredient_id), amount in totals.items())
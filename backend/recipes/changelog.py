@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from api.constants import (SYNC_COMPACT_BATCH_SIZE, SYNC_PAGE_SIZE,
+                           SYNC_SETTLE_SECONDS)
+from recipes.models import ChangeLogEntry
+
+
+class TokenExpired(Exception):
+    """Записи после токена уже удалены сжатием журнала."""
+
+
+def record(kind, action, object_id, user_id=None):
+    ChangeLogEntry.objects.create(kind=kind, action=action,
+                                  object_id=object_id, user_id=user_id)
+
+
+def record_many(kind, action, object_ids):
+    ChangeLogEntry.objects.bulk_create(
+        (ChangeLogEntry(kind=kind, action=action, object_id=object_id)
+         for object_id in object_ids), batch_size=SYNC_COMPACT_BATCH_SIZE)
+
+
+def settled_seq():
+    """Последний номер, раньше которого не появится новых записей.
+
+    Номера выдаются при вставке, а видны записи после коммита, поэтому
+    самые свежие записи отдаются только через SYNC_SETTLE_SECONDS:
+    к этому времени транзакции с меньшими номерами уже завершены.
+    """
+    entry = ChangeLogEntry.objects.filter(
+        created__lte=timezone.now() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    ).order_by('-seq').values_list('seq', flat=True).first()
+    return entry or 0
+
+
+def floor_seq():
+    first = ChangeLogEntry.objects.order_by('seq').first()
+    if first is not None and first.action == ChangeLogEntry.COMPACTED:
+        return first.seq
+    return 0
+
+
+def changes(user_id, since, limit=SYNC_PAGE_SIZE):
+    """Изменения после since, видимые пользователю: (записи, новый токен,
+    есть ли еще). Из нескольких записей об одном объекте остается
+    последняя."""
+    if since < floor_seq():
+        raise TokenExpired
+    last = settled_seq()
+    entries = list(ChangeLogEntry.objects.filter(
+        Q(user_id__isnull=True) | Q(user_id=user_id),
+        seq__gt=since, seq__lte=last,
+    ).exclude(action=ChangeLogEntry.COMPACTED).order_by('seq')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if has_more:
+        last = entries[-1].seq
+    latest = {(entry.kind, entry.object_id): entry for entry in entries}
+    return list(latest.values()), max(last, since), has_more
+
+
+def compact(days, batch_size=SYNC_COMPACT_BATCH_SIZE):
+    """Удаляет записи старше days дней и записи, перекрытые более
+    поздними о том же объекте. Вместо последней удаленной записи
+    остается метка границы: токены до нее считаются устаревшими."""
+    removed = 0
+    floor = ChangeLogEntry.objects.filter(
+        created__lt=timezone.now() - timedelta(days=days)
+    ).order_by('-seq').values_list('seq', flat=True).first()
+    if floor is not None:
+        with transaction.atomic():
+            removed += ChangeLogEntry.objects.filter(
+                seq__lt=floor).delete()[0]
+            ChangeLogEntry.objects.filter(seq=floor).update(
+                action=ChangeLogEntry.COMPACTED)
+    superseded = Exists(ChangeLogEntry.objects.filter(
+        Q(kind=ChangeLogEntry.RECIPE) | Q(user_id=OuterRef('user_id')),
+        kind=OuterRef('kind'), object_id=OuterRef('object_id'),
+        seq__gt=OuterRef('seq')))
+    start = floor or 0
+    last = ChangeLogEntry.objects.order_by('-seq').values_list(
+        'seq', flat=True).first() or 0
+    while start < last:
+        removed += ChangeLogEntry.objects.filter(
+            superseded, seq__gt=start, seq__lte=start + batch_size,
+        ).exclude(action=ChangeLogEntry.COMPACTED).delete()[0]
+        start += batch_size
+    return removed
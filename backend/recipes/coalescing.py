@@ -0,0 +1,112 @@
+import hashlib
+import time
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api.constants import (COALESCE_LOCK_SECONDS, COALESCE_POLL_SECONDS,
+                           COALESCE_WAIT_SECONDS)
+
+RECIPE_DETAIL_KEY = 'recipe-card:{}'
+LIST_VERSION_KEY = '{}:version'
+RECIPE_LIST = 'recipe-list'
+USER_LIST = 'user-list'
+USER_LISTS = 'user-lists:{}'
+
+
+def get_or_compute(key, compute, fresh, stale=0):
+    """Значение из кеша; при промахе его пересчитывает один процесс.
+
+    Кто взял блокировку в кеше, вызывает compute и сохраняет результат.
+    Остальные отдают устаревшую копию, если она еще хранится (stale
+    секунд после fresh), или ждут новую до COALESCE_WAIT_SECONDS и лишь
+    потом считают сами.
+    """
+    if not settings.READ_COALESCING:
+        return compute()
+    entry = cache.get(key)
+    if entry is not None and entry['fresh_until'] > time.time():
+        return entry['value']
+    lock = key + ':lock'
+    if cache.add(lock, 1, COALESCE_LOCK_SECONDS):
+        try:
+            value = compute()
+            cache.set(key, {'value': value,
+                            'fresh_until': time.time() + fresh},
+                      fresh + stale)
+            return value
+        finally:
+            cache.delete(lock)
+    if entry is not None:
+        return entry['value']
+    deadline = time.monotonic() + COALESCE_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(COALESCE_POLL_SECONDS)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value']
+    return compute()
+
+
+def expire(keys, stale):
+    """Помечает значения устаревшими: их еще можно отдавать, пока один
+    процесс считает новые."""
+    entries = cache.get_many(keys)
+    for entry in entries.values():
+        entry['fresh_until'] = 0
+    if entries:
+        cache.set_many(entries, stale)
+
+
+def recipe_list_key(request):
+    """Ключ страницы списка для анонима: полный адрес с параметрами в
+    порядке сортировки (так же их сортируют ссылки next и previous) и
+    версия списка, меняющаяся при любом изменении рецептов."""
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    url = f'{request.build_absolute_uri(request.path)}?{query}'
+    return (f'recipe-list:{list_version(RECIPE_LIST)}:'
+            f'{hashlib.sha1(url.encode()).hexdigest()}')
+
+
+def list_version(name):
+    """Версия списка name; ключи кеша с ней устаревают после
+    bump_list(name)."""
+    key = LIST_VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_list(name):
+    cache.set(LIST_VERSION_KEY.format(name), uuid.uuid4().hex, None)
+
+
+def bump_lists(*names):
+    def bump():
+        for name in names:
+            bump_list(name)
+
+    transaction.on_commit(bump)
+
+
+def expire_recipes(recipe_ids):
+    def expire_cards():
+        expire([RECIPE_DETAIL_KEY.format(pk) for pk in recipe_ids],
+               settings.RECIPE_DETAIL_STALE_SECONDS)
+        bump_list(RECIPE_LIST)
+
+    transaction.on_commit(expire_cards)
+
+
+def forget_recipes(recipe_ids):
+    def forget_cards():
+        cache.delete_many([RECIPE_DETAIL_KEY.format(pk)
+                           for pk in recipe_ids])
+        bump_list(RECIPE_LIST)
+
+    transaction.on_commit(forget_cards)
@@ -0,0 +1,113 @@
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import F, signals
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes import changelog, coalescing, syndication, usage
+from recipes.models import (CartIngredient, ChangeLogEntry, DeletionJob,
+                            RecipeIngredient, Recipes)
+from users.models import User
+
+MODELS = {DeletionJob.USER: User, DeletionJob.RECIPE: Recipes}
+
+
+def release_recipe_ingredients(ids):
+    usage.change_recipes(RecipeIngredient.objects.filter(
+        pk__in=ids).values_list('ingredient_id', flat=True), ())
+
+
+def release_cart_ingredients(ids):
+    deltas = Counter()
+    deltas.subtract(CartIngredient.objects.filter(
+        pk__in=ids).values_list('ingredient_id', flat=True))
+    usage.add(carts=deltas)
+
+
+# Вычитают удаляемую пачку из статистики ингредиентов в той же
+# транзакции, поэтому перезапуск задачи не вычтет строки дважды
+RELEASE = {RecipeIngredient: release_recipe_ingredients,
+           CartIngredient: release_cart_ingredients}
+
+
+@transaction.atomic
+def hide_recipe(recipe):
+    """Рецепт сразу пропадает из API и списков покупок (cart.summary),
+    а удаляется позже пачками вместе с вкладом в итоги корзин."""
+    Recipes.all_objects.filter(pk=recipe.pk).update(is_hidden=True)
+    changelog.record(ChangeLogEntry.RECIPE, ChangeLogEntry.DELETE, recipe.pk)
+    coalescing.forget_recipes([recipe.pk])
+    transaction.on_commit(
+        lambda: syndication.invalidate([recipe.author_id]))
+    return DeletionJob.objects.create(kind=DeletionJob.RECIPE,
+                                      object_id=recipe.pk)
+
+
+@transaction.atomic
+def hide_user(user):
+    """Пользователь теряет доступ, он и его рецепты пропадают из API;
+    сами строки удаляются позже пачками."""
+    User.objects.filter(pk=user.pk).update(is_hidden=True, is_active=False)
+    Token.objects.filter(user=user).delete()
+    recipes = Recipes.all_objects.filter(author=user, is_hidden=False)
+    recipe_ids = list(recipes.values_list('pk', flat=True))
+    changelog.record_many(ChangeLogEntry.RECIPE, ChangeLogEntry.DELETE,
+                          recipe_ids)
+    coalescing.forget_recipes(recipe_ids)
+    coalescing.bump_lists(coalescing.USER_LIST)
+    recipes.update(is_hidden=True)
+    transaction.on_commit(lambda: syndication.invalidate([user.pk]))
+    return DeletionJob.objects.create(kind=DeletionJob.USER,
+                                      object_id=user.pk)
+
+
+def has_delete_receivers(relation):
+    return (signals.pre_delete.has_listeners(relation.related_model)
+            or signals.post_delete.has_listeners(relation.related_model))
+
+
+def dependents(model, lookup='', chain=()):
+    """Модели, каскадно удаляемые вместе с model, от дальних к ближним:
+    [(модель, путь фильтра до удаляемого объекта)]. Модели с сигналами
+    удаления идут раньше соседних: обработчики могут читать их данные
+    (например, список покупок — ингредиенты рецепта)."""
+    result = []
+    for relation in sorted(model._meta.related_objects,
+                           key=lambda relation: not has_delete_receivers(
+                               relation)):
+        if relation.on_delete is not models.CASCADE:
+            continue
+        related = relation.related_model
+        path = relation.field.name + (f'__{lookup}' if lookup else '')
+        if related not in chain:
+            result.extend(dependents(related, path, chain + (model,)))
+        result.append((related, path))
+    return result
+
+
+def delete_in_batches(job, model, lookup, batch_size):
+    """Удаляет строки короткими транзакциями по batch_size, не загружая
+    в память все связанные объекты сразу."""
+    queryset = model._base_manager.filter(**{lookup: job.object_id})
+    DeletionJob.objects.filter(pk=job.pk).update(step=model._meta.label)
+    release = RELEASE.get(model)
+    while ids := list(queryset.values_list('pk', flat=True)[:batch_size]):
+        with transaction.atomic():
+            if release:
+                release(ids)
+            model._base_manager.filter(pk__in=ids).delete()
+            DeletionJob.objects.filter(pk=job.pk).update(
+                deleted=F('deleted') + len(ids))
+
+
+def run(job, batch_size):
+    """Задачу можно перезапускать: каждый шаг продолжает с оставшихся
+    строк."""
+    model = MODELS[job.kind]
+    DeletionJob.objects.filter(pk=job.pk).update(status=DeletionJob.RUNNING)
+    for related, lookup in dependents(model):
+        delete_in_batches(job, related, lookup, batch_size)
+    delete_in_batches(job, model, 'pk', batch_size)
+    DeletionJob.objects.filter(pk=job.pk).update(
+        status=DeletionJob.DONE, step='', finished=timezone.now())
@@ -0,0 +1,73 @@
+from itertools import islice
+
+from django.conf import settings
+
+from api.constants import FEED_FANOUT_BATCH_SIZE
+from recipes.models import FeedEntry, Recipes
+from users.models import Subscriptions
+
+TIMELINE = 'timeline'
+QUERY = 'query'
+
+
+def timeline_enabled():
+    return settings.RECIPES_FEED_BACKEND == TIMELINE
+
+
+def feed_queryset(user, backend=None):
+    """Рецепты авторов, на которых подписан user, от новых к старым."""
+    if (backend or settings.RECIPES_FEED_BACKEND) == TIMELINE:
+        return FeedEntry.objects.filter(
+            user=user, recipe__is_hidden=False).select_related('recipe')
+    return Recipes.objects.filter(author__in=Subscriptions.objects.filter(
+        subscriber=user).values('subscribed_to'))
+
+
+def feed_recipes(page):
+    return [item.recipe if isinstance(item, FeedEntry) else item
+            for item in page]
+
+
+def _bulk_insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, FEED_FANOUT_BATCH_SIZE))
+        if not batch:
+            break
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(recipe):
+    subscribers = Subscriptions.objects.filter(
+        subscribed_to=recipe.author_id).values_list('subscriber_id',
+                                                    flat=True)
+    _bulk_insert(
+        FeedEntry(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+        for user_id in subscribers.iterator(chunk_size=FEED_FANOUT_BATCH_SIZE)
+    )
+
+
+def backfill(subscriber_id, author_id):
+    """Копирует в ленту все рецепты автора пачками, чтобы лента совпадала
+    с выдачей query."""
+    recipes = Recipes.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date')
+    _bulk_insert(
+        FeedEntry(user_id=subscriber_id, recipe_id=recipe_id,
+                  pub_date=pub_date)
+        for recipe_id, pub_date in recipes.iterator(
+            chunk_size=FEED_FANOUT_BATCH_SIZE)
+    )
+
+
+def unfollow(subscriber_id, author_id):
+    FeedEntry.objects.filter(user_id=subscriber_id,
+                             recipe__author_id=author_id).delete()
+
+
+def rebuild():
+    FeedEntry.objects.all().delete()
+    subscriptions = Subscriptions.objects.values_list(
+        'subscriber_id', 'subscribed_to_id')
+    for subscriber_id, author_id in subscriptions.iterator():
+        backfill(subscriber_id, author_id)
@@ -0,0 +1,100 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from recipes import coalescing, registry
+from recipes.models import Recipes
+
+
+class Burst:
+    """Потоки стартуют одновременно; каждый считает свои запросы к базе."""
+
+    def __init__(self, threads):
+        self.threads = threads
+        self.barrier = threading.Barrier(threads)
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.statuses = set()
+
+    def count(self, execute, sql, params, many, context):
+        with self.lock:
+            self.queries += 1
+        return execute(sql, params, many, context)
+
+    def run(self, target):
+        def worker(index):
+            try:
+                self.barrier.wait()
+                with connection.execute_wrapper(self.count):
+                    target(index, self)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker, args=(index,))
+                   for index in range(self.threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = """Нагружает одновременными запросами карточку рецепта и
+    справочники сразу после сброса кеша и показывает, сколько запросов к
+    базе делает вся волна с объединением промахов и без него"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=50)
+        parser.add_argument('--recipe', type=int,
+                            help='id рецепта, по умолчанию последний')
+
+    def handle(self, *args, **options):
+        recipe_id = options['recipe'] or Recipes.objects.values_list(
+            'id', flat=True).order_by('-id').first()
+        if recipe_id is None:
+            raise CommandError('Нет рецептов.')
+        host = urlsplit(settings.SITE_URL).netloc or 'localhost'
+        url = f'/api/recipes/{recipe_id}/'
+        key = coalescing.RECIPE_DETAIL_KEY.format(recipe_id)
+
+        def get_recipe(index, burst):
+            status = Client(HTTP_HOST=host,
+                            REMOTE_ADDR=f'10.0.{index // 250}.{index % 250}'
+                            ).get(url).status_code
+            with burst.lock:
+                burst.statuses.add(status)
+
+        def refresh_registry(index, burst):
+            registry.ReferenceData().refresh()
+
+        scenarios = (
+            ('карточка, нет в кеше',
+             lambda: cache.delete(key), get_recipe),
+            ('карточка после правки',
+             lambda: coalescing.expire(
+                 [key], settings.RECIPE_DETAIL_STALE_SECONDS), get_recipe),
+            ('справочники, новая версия',
+             registry.bump_version, refresh_registry),
+        )
+        for name, reset, target in scenarios:
+            for enabled in (False, True):
+                with override_settings(READ_COALESCING=enabled):
+                    Client(HTTP_HOST=host).get(url)
+                    reset()
+                    burst = Burst(options['threads'])
+                    elapsed = burst.run(target)
+                mode = 'объединение' if enabled else 'без объединения'
+                statuses = ','.join(map(str, sorted(burst.statuses)))
+                self.stdout.write(
+                    f'{name:<28} {mode:<16} '
+                    f'запросов к базе {burst.queries:5}  '
+                    f'{elapsed * 1000:8.1f} мс  {statuses}')
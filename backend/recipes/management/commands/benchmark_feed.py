@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import feed
+from recipes.models import Recipes
+from users.models import Subscriptions, User
+
+PREFIX = 'feedbench'
+
+
+class Command(BaseCommand):
+    help = """Сравнивает ленту подписок на запросе и на timeline-таблице
+    для пользователей с 10, 1000 и 10000 подписок. Все данные создаются
+    во временной транзакции и откатываются."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--follows', type=int, nargs='+',
+                            default=[10, 1000, 10000])
+        parser.add_argument('--recipes-per-author', type=int, default=3)
+        parser.add_argument('--pages', type=int, default=5,
+                            help='сколько страниц пролистать по курсору')
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            authors = self.create_authors(max(options['follows']),
+                                          options['recipes_per_author'])
+            for follows in options['follows']:
+                reader = self.create_reader(authors[:follows])
+                for backend in (feed.QUERY, feed.TIMELINE):
+                    first, deep = self.measure(reader, backend, options)
+                    self.stdout.write(
+                        f'{follows:>6} подписок  {backend:<8}  '
+                        f'первая страница {first * 1000:8.2f} мс  '
+                        f'{options["pages"]} страниц {deep * 1000:8.2f} мс')
+            transaction.set_rollback(True)
+
+    def create_authors(self, count, recipes_per_author):
+        User.objects.bulk_create(
+            User(username=f'{PREFIX}{i}', email=f'{PREFIX}{i}@example.com',
+                 first_name=PREFIX, last_name=PREFIX)
+            for i in range(count))
+        authors = list(User.objects.filter(
+            username__startswith=PREFIX).order_by('id'))
+        Recipes.objects.bulk_create(
+            (Recipes(author=author, name=f'{PREFIX} {author.id}-{i}',
+                     text=PREFIX, cooking_time=1)
+             for author in authors for i in range(recipes_per_author)),
+            batch_size=5000)
+        return authors
+
+    def create_reader(self, authors):
+        index = len(authors)
+        reader = User.objects.create(
+            username=f'{PREFIX}r{index}', email=f'{PREFIX}r{index}@ex.com',
+            first_name=PREFIX, last_name=PREFIX)
+        Subscriptions.objects.bulk_create(
+            (Subscriptions(subscriber=reader, subscribed_to=author)
+             for author in authors), batch_size=5000)
+        for author in authors:
+            feed.backfill(reader.id, author.id)
+        return reader
+
+    def measure(self, reader, backend, options):
+        limit, first, deep = options['limit'], [], []
+        for _ in range(options['repeat']):
+            queryset = feed.feed_queryset(reader, backend).order_by(
+                '-pub_date')
+            started = time.perf_counter()
+            page = list(queryset[:limit])
+            feed.feed_recipes(page)
+            first.append(time.perf_counter() - started)
+            for _ in range(options['pages'] - 1):
+                if not page:
+                    break
+                page = list(queryset.filter(
+                    pub_date__lt=page[-1].pub_date)[:limit])
+                feed.feed_recipes(page)
+            deep.append(time.perf_counter() - started)
+        return min(first), min(deep)
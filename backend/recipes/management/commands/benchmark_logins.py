@@ -0,0 +1,85 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import (
+    get_password_validators, validate_password)
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+from users.validators import load_passwords
+
+EMAIL = 'loginbench@example.com'
+PASSWORD = 'Xq7-loginbench-pass'
+
+
+class Command(BaseCommand):
+    help = """Измеряет входы в секунду на одно ядро при разном числе
+    итераций PBKDF2, проверяет пересчет хеша при входе и стоимость
+    проверки пароля при регистрации. Данные создаются во временной
+    транзакции и откатываются."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, nargs='+',
+                            default=[100000, 260000, 390000])
+        parser.add_argument('--logins', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create(
+                email=EMAIL, username='loginbench',
+                first_name='loginbench', last_name='loginbench')
+            for iterations in options['iterations']:
+                with override_settings(
+                        PASSWORD_PBKDF2_ITERATIONS=iterations):
+                    user.password = make_password(PASSWORD)
+                    user.save(update_fields=['password'])
+                    per_login = self.measure(options['logins'])
+                self.stdout.write(
+                    f'{iterations:>8} итераций  '
+                    f'{per_login * 1000:7.1f} мс на вход  '
+                    f'{1 / per_login:7.1f} входов/с на ядро')
+            self.check_rehash(user, options['iterations'][0])
+            self.measure_validators(user)
+            transaction.set_rollback(True)
+
+    def measure(self, logins):
+        started = time.perf_counter()
+        for _ in range(logins):
+            user = authenticate(email=EMAIL, password=PASSWORD)
+            Token.objects.get_or_create(user=user)
+        return (time.perf_counter() - started) / logins
+
+    def check_rehash(self, user, iterations):
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=iterations):
+            user.password = make_password(PASSWORD)
+            user.save(update_fields=['password'])
+        authenticate(email=EMAIL, password=PASSWORD)
+        stored = User.objects.values_list('password', flat=True).get(
+            pk=user.pk)
+        current = int(stored.split('$')[1])
+        expected = settings.PASSWORD_PBKDF2_ITERATIONS
+        result = 'пересчитан' if current == expected else 'не пересчитан'
+        self.stdout.write(f'Хеш с {iterations} итерациями после входа '
+                          f'{result}: {current} итераций')
+
+    def measure_validators(self, user):
+        load_passwords.cache_clear()
+        started = time.perf_counter()
+        validators = get_password_validators(
+            settings.AUTH_PASSWORD_VALIDATORS)
+        validate_password(PASSWORD, user, validators)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        validators = get_password_validators(
+            settings.AUTH_PASSWORD_VALIDATORS)
+        validate_password(PASSWORD, user, validators)
+        warm = time.perf_counter() - started
+        self.stdout.write(
+            f'Проверка пароля при регистрации: первая '
+            f'{cold * 1000:.1f} мс, с загруженным списком '
+            f'{warm * 1000:.1f} мс')
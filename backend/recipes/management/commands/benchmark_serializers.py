@@ -0,0 +1,117 @@
+import time
+from itertools import islice
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api import representations
+from api.serializers import RecipesSerializer
+from recipes.models import Favorites, Recipes
+from users.models import User
+from users.serializers import UserSerializer
+
+
+def pages(ids, size):
+    iterator = iter(ids)
+    while page := list(islice(iterator, size)):
+        yield page
+
+
+class Command(BaseCommand):
+    help = """Сверяет JSON быстрого пути чтения (api.representations) с
+    RecipesSerializer и UserSerializer на всех рецептах и пользователях —
+    страницы списков и карточки рецептов — и сравнивает скорость в
+    объектах в секунду"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--readers', type=int, default=3,
+                            help='сколько пользователей с избранным '
+                                 'проверить кроме анонима')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        size = options['page_size']
+        factory = RequestFactory(
+            HTTP_HOST=urlsplit(settings.SITE_URL).netloc or 'localhost')
+        reader_ids = Favorites.objects.values_list(
+            'user_id', flat=True).distinct().order_by('user_id')
+        readers = [AnonymousUser()] + list(User.objects.filter(
+            id__in=list(reader_ids[:options['readers']])))
+        recipe_ids = list(Recipes.objects.values_list('id', flat=True))
+        user_ids = list(User.objects.filter(is_hidden=False).order_by(
+            'id').values_list('id', flat=True))
+        mismatches = 0
+        for reader in readers:
+            request = factory.get('/api/recipes/')
+            request.user = reader
+            for name, ids, slow, fast in (
+                    ('рецепты', recipe_ids, self.slow_recipes,
+                     self.fast_recipes),
+                    ('карточки', recipe_ids, self.slow_cards,
+                     self.fast_cards),
+                    ('пользователи', user_ids, self.slow_users,
+                     self.fast_users)):
+                for page in pages(ids, size):
+                    if self.render(slow(page, request)) != self.render(
+                            fast(page, request)):
+                        mismatches += 1
+                        self.stderr.write(f'{reader}: {name} {page[0]}…'
+                                          f'{page[-1]} не совпадают')
+                slow_rate = self.measure(slow, ids, size, request, options)
+                fast_rate = self.measure(fast, ids, size, request, options)
+                self.stdout.write(
+                    f'{str(reader):<14} {name:<12} '
+                    f'сериализаторы {slow_rate:10.0f} объектов/с  '
+                    f'быстрый путь {fast_rate:10.0f} объектов/с  '
+                    f'x{fast_rate / slow_rate if slow_rate else 0:.1f}')
+        if mismatches:
+            raise CommandError(f'Страниц с расхождениями: {mismatches}')
+        self.stdout.write('Выдача совпадает.')
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def slow_recipes(self, ids, request):
+        recipes = Recipes.objects.in_bulk(ids)
+        return RecipesSerializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True,
+            context={'request': request}).data
+
+    def slow_cards(self, ids, request):
+        recipes = Recipes.objects.in_bulk(ids)
+        return [RecipesSerializer(recipes[pk],
+                                  context={'request': request}).data
+                for pk in ids if pk in recipes]
+
+    def fast_cards(self, ids, request):
+        return [representations.personal_recipe(
+            representations.shared_recipe(pk), request) for pk in ids]
+
+    def slow_users(self, ids, request):
+        users = User.objects.in_bulk(ids)
+        return UserSerializer([users[pk] for pk in ids], many=True,
+                              context={'request': request}).data
+
+    def fast_recipes(self, ids, request):
+        return representations.recipes_by_id(
+            ids, request.user, representations.media_prefix(request))
+
+    def fast_users(self, ids, request):
+        rows = {row['id']: row for row in User.objects.filter(
+            id__in=ids).values(*representations.USER_FIELDS)}
+        return representations.users([rows[pk] for pk in ids], request.user)
+
+    def measure(self, serialize, ids, size, request, options):
+        best = None
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            for page in pages(ids, size):
+                self.render(serialize(page, request))
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return len(ids) / best if best else 0
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from users.models import User
+from users.search import search_users
+
+BATCH = 10000
+PASSWORD = 'pbkdf2_sha256$1$bench$unused'
+
+
+class Command(BaseCommand):
+    help = """Создает во временной транзакции синтетических пользователей,
+    замеряет поиск по справочнику (точное совпадение, короткий и длинный
+    префикс, два слова) и показывает первую строку плана запроса, чтобы
+    убедиться, что используются индексы по lower(поле). Данные
+    откатываются."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.populate(options['users'])
+            self.stdout.write(
+                f'Создано {options["users"]} пользователей за '
+                f'{time.perf_counter() - started:.1f} с')
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(f'ANALYZE {User._meta.db_table}')
+            middle = options['users'] // 2
+            terms = (
+                f'bench{middle}',
+                'bench1',
+                f'bench{middle}'[:-1],
+                f'bench{middle}@example',
+                f'имя{middle % 1000} фамилия{middle % 997}',
+            )
+            for term in terms:
+                self.measure(term, options['repeat'], options['limit'])
+            transaction.set_rollback(True)
+
+    def populate(self, count):
+        for start in range(0, count, BATCH):
+            User.objects.bulk_create([
+                User(username=f'bench{number}',
+                     email=f'bench{number}@example.com',
+                     first_name=f'Имя{number % 1000}',
+                     last_name=f'Фамилия{number % 997}',
+                     password=PASSWORD)
+                for number in range(start, min(start + BATCH, count))
+            ], batch_size=BATCH)
+
+    def measure(self, term, repeat, limit):
+        queryset = search_users(User.objects.all(), term)[:limit]
+        found = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            found = list(queryset.values_list('username', flat=True))
+        elapsed = (time.perf_counter() - started) / repeat
+        plan = queryset.explain().splitlines()[0].strip()
+        first = found[0] if found else '-'
+        self.stdout.write(
+            f'{term!r:<32} {elapsed * 1000:8.1f} мс  '
+            f'найдено {len(found):3}, первый {first}\n    {plan}')
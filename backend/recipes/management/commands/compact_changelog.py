@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.constants import SYNC_RETENTION_DAYS
+from recipes import changelog
+
+
+class Command(BaseCommand):
+    help = """Сжимает журнал изменений для /api/sync/: удаляет записи
+    старше срока хранения и перекрытые более поздними"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=SYNC_RETENTION_DAYS,
+                            help='сколько дней хранить записи')
+
+    def handle(self, *args, **options):
+        removed = changelog.compact(options['days'])
+        self.stdout.write(f'Удалено записей: {removed}.')
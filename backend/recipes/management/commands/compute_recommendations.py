@@ -0,0 +1,137 @@
+from array import array
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from scipy import sparse
+
+from api.constants import (CART_INTERACTION_WEIGHT,
+                           RECOMMENDATIONS_CHUNK_SIZE, RECOMMENDATIONS_TOP_N)
+from recipes.models import (Favorites, Recommendation, RecipeSimilarity,
+                            ShoppingCart)
+
+
+def load_interactions(chunk_size):
+    """Читает избранное и корзины в компактные массивы (user, recipe, w)."""
+    users, recipes, weights = array('q'), array('q'), array('d')
+    for model, weight in ((Favorites, 1.0),
+                          (ShoppingCart, CART_INTERACTION_WEIGHT)):
+        rows = model.objects.values_list('user_id', 'recipe_id').order_by()
+        for user_id, recipe_id in rows.iterator(chunk_size=chunk_size):
+            users.append(user_id)
+            recipes.append(recipe_id)
+            weights.append(weight)
+    return (np.frombuffer(users, dtype=np.int64),
+            np.frombuffer(recipes, dtype=np.int64),
+            np.frombuffer(weights, dtype=np.float64))
+
+
+def top_n(matrix, n):
+    """Для каждой строки CSR-матрицы возвращает n лучших (колонка, score)."""
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        scores = matrix.data[start:end]
+        columns = matrix.indices[start:end]
+        if len(scores) > n:
+            best = np.argpartition(-scores, n)[:n]
+            scores, columns = scores[best], columns[best]
+        order = np.argsort(-scores, kind='stable')
+        yield row, columns[order], scores[order]
+
+
+class Command(BaseCommand):
+    help = """Пересчитывает похожие рецепты и рекомендации пользователям
+    по избранному и спискам покупок (item-to-item косинусная близость)"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=RECOMMENDATIONS_TOP_N,
+                            help='сколько похожих рецептов хранить')
+        parser.add_argument('--chunk-size', type=int,
+                            default=RECOMMENDATIONS_CHUNK_SIZE,
+                            help='размер пачки рецептов/пользователей')
+        parser.add_argument('--skip-users', action='store_true',
+                            help='не пересчитывать рекомендации')
+
+    def handle(self, *args, **options):
+        top, chunk_size = options['top'], options['chunk_size']
+        user_ids, recipe_ids, weights = load_interactions(chunk_size)
+        if not len(user_ids):
+            self.stdout.write('Нет данных для расчета.')
+            return
+        users, user_index = np.unique(user_ids, return_inverse=True)
+        recipes, recipe_index = np.unique(recipe_ids, return_inverse=True)
+        interactions = sparse.csr_matrix(
+            (weights, (user_index, recipe_index)),
+            shape=(len(users), len(recipes)))
+        del user_ids, recipe_ids, weights, user_index, recipe_index
+
+        norms = np.sqrt(np.asarray(
+            interactions.multiply(interactions).sum(axis=0))).ravel()
+        normalized = (interactions @ sparse.diags(1 / norms)).tocsc()
+        by_recipe = normalized.T.tocsr()
+
+        rows, columns, scores = array('q'), array('q'), array('d')
+        for start in range(0, len(recipes), chunk_size):
+            block = by_recipe[start:start + chunk_size] @ normalized
+            block = block.tocsr()
+            block.setdiag(0, k=start)
+            block.eliminate_zeros()
+            similarities = []
+            for row, similar, score in top_n(block, top):
+                recipe = start + row
+                rows.extend([recipe] * len(similar))
+                columns.extend(similar)
+                scores.extend(score)
+                similarities.extend(
+                    RecipeSimilarity(recipe_id=int(recipes[recipe]),
+                                     similar_id=int(recipes[column]),
+                                     score=float(value))
+                    for column, value in zip(similar, score))
+            with transaction.atomic():
+                RecipeSimilarity.objects.filter(
+                    recipe_id__in=recipes[start:start + chunk_size].tolist()
+                ).delete()
+                RecipeSimilarity.objects.bulk_create(
+                    similarities, batch_size=chunk_size)
+        self.stdout.write(f'Похожие рецепты: {len(recipes)} рецептов, '
+                          f'{len(scores)} пар.')
+        RecipeSimilarity.objects.filter(
+            ~Exists(Favorites.objects.filter(recipe=OuterRef('recipe'))),
+            ~Exists(ShoppingCart.objects.filter(recipe=OuterRef('recipe'))),
+        ).delete()
+
+        if options['skip_users']:
+            return
+        neighbours = sparse.csr_matrix(
+            (np.frombuffer(scores, dtype=np.float64),
+             (np.frombuffer(rows, dtype=np.int64),
+              np.frombuffer(columns, dtype=np.int64))),
+            shape=(len(recipes), len(recipes)))
+        del normalized, by_recipe
+        total = 0
+        for start in range(0, len(users), chunk_size):
+            seen = interactions[start:start + chunk_size]
+            block = (seen @ neighbours).tocsr()
+            block = block - block.multiply(seen > 0)
+            block.eliminate_zeros()
+            recommendations = [
+                Recommendation(user_id=int(users[start + row]),
+                               recipe_id=int(recipes[column]),
+                               score=float(value))
+                for row, recommended, score in top_n(block, top)
+                for column, value in zip(recommended, score)
+            ]
+            total += len(recommendations)
+            with transaction.atomic():
+                Recommendation.objects.filter(
+                    user_id__in=users[start:start + chunk_size].tolist()
+                ).delete()
+                Recommendation.objects.bulk_create(
+                    recommendations, batch_size=chunk_size)
+        Recommendation.objects.filter(
+            ~Exists(Favorites.objects.filter(user=OuterRef('user'))),
+            ~Exists(ShoppingCart.objects.filter(user=OuterRef('user'))),
+        ).delete()
+        self.stdout.write(f'Рекомендации: {len(users)} пользователей, '
+                          f'{total} записей.')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.constants import JSONL_CHUNK_SIZE
+from recipes.jsonl import dumps, iter_records
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    help = """Выгружает рецепты с ингредиентами, тегами, авторами
+    и путями к изображениям в JSON Lines"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('filepath', type=str, help="путь до файла")
+        parser.add_argument('--chunk-size', type=int,
+                            default=JSONL_CHUNK_SIZE)
+
+    def handle(self, *args, **kwargs):
+        counter = 0
+        with open(kwargs['filepath'], 'w', encoding='utf-8') as jsonl_file:
+            for record in iter_records(Recipes.objects.all(),
+                                       kwargs['chunk_size']):
+                jsonl_file.write(dumps(record))
+                counter += 1
+        print(f'Было выгружено рецептов: {counter}')
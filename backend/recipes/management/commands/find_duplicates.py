@@ -0,0 +1,136 @@
+from itertools import groupby, islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from api.constants import DUPLICATE_SIMILARITY, DUPLICATES_CHUNK_SIZE
+from recipes.minhash import buckets, from_bytes, signatures_for, similarity
+from recipes.models import (RecipeDuplicate, Recipes, RecipeSignature,
+                            SignatureBucket)
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Clusters:
+    """Система непересекающихся множеств; корень кластера — самый ранний
+    рецепт."""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        root = item
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while item != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+
+class Command(BaseCommand):
+    help = """Считает MinHash-сигнатуры рецептов, у которых их нет, и
+    заново группирует вероятные дубликаты по корзинам LSH"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reindex', action='store_true',
+                            help='пересчитать сигнатуры всех рецептов')
+        parser.add_argument('--threshold', type=float,
+                            default=DUPLICATE_SIMILARITY,
+                            help='минимальное сходство дубликатов')
+        parser.add_argument('--chunk-size', type=int,
+                            default=DUPLICATES_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        indexed = self.index(options['reindex'], chunk_size)
+        self.stdout.write(f'Посчитано сигнатур: {indexed}.')
+        clusters = self.cluster(options['threshold'], chunk_size)
+        duplicates = self.save(clusters, chunk_size)
+        self.stdout.write(f'Вероятных дубликатов: {duplicates}.')
+
+    def index(self, reindex, chunk_size):
+        recipes = Recipes.objects.order_by('id')
+        if not reindex:
+            recipes = recipes.filter(signature__isnull=True)
+        total = 0
+        for batch in chunks(recipes.values('id', 'name', 'text').iterator(
+                chunk_size=chunk_size), chunk_size):
+            signatures = signatures_for(batch)
+            with transaction.atomic():
+                RecipeSignature.objects.filter(
+                    recipe_id__in=signatures).delete()
+                SignatureBucket.objects.filter(
+                    recipe_id__in=signatures).delete()
+                RecipeSignature.objects.bulk_create(
+                    RecipeSignature(recipe_id=recipe_id,
+                                    signature=sig.tobytes())
+                    for recipe_id, sig in signatures.items())
+                SignatureBucket.objects.bulk_create(
+                    (SignatureBucket(recipe_id=recipe_id, band=band,
+                                     bucket=bucket)
+                     for recipe_id, sig in signatures.items()
+                     for band, bucket in buckets(sig)),
+                    batch_size=chunk_size)
+            total += len(batch)
+        return total
+
+    def cluster(self, threshold, chunk_size):
+        """Проверяет по сигнатурам только рецепты из общих корзин; корзины
+        читаются потоком и обрабатываются пачками."""
+        shared = SignatureBucket.objects.filter(Exists(
+            SignatureBucket.objects.filter(
+                band=OuterRef('band'), bucket=OuterRef('bucket')
+            ).exclude(recipe_id=OuterRef('recipe_id'))))
+        rows = shared.values_list('band', 'bucket', 'recipe_id').order_by(
+            'band', 'bucket', 'recipe_id').iterator(chunk_size=chunk_size)
+        groups = ([recipe_id for _, _, recipe_id in group]
+                  for _, group in groupby(rows, key=lambda row: row[:2]))
+        clusters = Clusters()
+        for batch in chunks(groups, chunk_size):
+            signatures = {
+                recipe_id: from_bytes(value)
+                for recipe_id, value in RecipeSignature.objects.filter(
+                    recipe_id__in={pk for group in batch for pk in group}
+                ).values_list('recipe_id', 'signature')}
+            for group in batch:
+                for index, recipe_id in enumerate(group):
+                    for other in group[:index]:
+                        if clusters.find(other) == clusters.find(recipe_id):
+                            continue
+                        if similarity(signatures[recipe_id],
+                                      signatures[other]) >= threshold:
+                            clusters.union(other, recipe_id)
+        return clusters
+
+    def save(self, clusters, chunk_size):
+        members = [recipe_id for recipe_id in clusters.parent
+                   if clusters.find(recipe_id) != recipe_id]
+        originals = {recipe_id: clusters.find(recipe_id)
+                     for recipe_id in members}
+        with transaction.atomic():
+            RecipeDuplicate.objects.all().delete()
+            for batch in chunks(members, chunk_size):
+                ids = set(batch) | {originals[pk] for pk in batch}
+                signatures = {
+                    recipe_id: from_bytes(value)
+                    for recipe_id, value in RecipeSignature.objects.filter(
+                        recipe_id__in=ids).values_list(
+                            'recipe_id', 'signature')}
+                RecipeDuplicate.objects.bulk_create(
+                    RecipeDuplicate(
+                        recipe_id=recipe_id, original_id=originals[recipe_id],
+                        similarity=similarity(
+                            signatures[recipe_id],
+                            signatures[originals[recipe_id]]))
+                    for recipe_id in batch)
+        return len(members)
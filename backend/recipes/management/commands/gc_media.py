@@ -0,0 +1,80 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from api.constants import (MEDIA_GC_BATCH_SIZE, MEDIA_GC_GRACE_HOURS,
+                           MEDIA_GC_WORKERS)
+from recipes.models import MediaBlob, Recipes
+from users.models import User
+
+
+def walk(root, prefix=''):
+    """Лениво обходит каталог, отдавая (имя в хранилище, stat)."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            name = f'{prefix}{entry.name}'
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(entry.path, f'{name}/')
+            elif entry.is_file(follow_symlinks=False):
+                yield name, entry.stat()
+
+
+def referenced(names):
+    return (set(Recipes.all_objects.filter(
+        image__in=names).values_list('image', flat=True))
+        | set(User.objects.filter(
+            avatar__in=names).values_list('avatar', flat=True)))
+
+
+def remove(name):
+    try:
+        os.remove(default_storage.path(name))
+    except FileNotFoundError:
+        pass
+    return name
+
+
+class Command(BaseCommand):
+    help = """Удаляет из MEDIA_ROOT файлы, на которые не ссылается
+    ни один рецепт или пользователь"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только показать, что будет удалено')
+        parser.add_argument('--grace-hours', type=float,
+                            default=MEDIA_GC_GRACE_HOURS,
+                            help='не трогать файлы моложе этого срока')
+        parser.add_argument('--batch-size', type=int,
+                            default=MEDIA_GC_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=MEDIA_GC_WORKERS)
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(default_storage.location):
+            return
+        deadline = time.time() - options['grace_hours'] * 3600
+        files = walk(default_storage.location)
+        scanned = orphans = size = 0
+        with ThreadPoolExecutor(options['workers']) as executor:
+            while True:
+                batch = dict(islice(files, options['batch_size']))
+                if not batch:
+                    break
+                scanned += len(batch)
+                used = referenced(list(batch))
+                garbage = [name for name, stat in batch.items()
+                           if name not in used and stat.st_mtime < deadline]
+                orphans += len(garbage)
+                size += sum(batch[name].st_size for name in garbage)
+                if options['dry_run']:
+                    for name in garbage:
+                        self.stdout.write(name)
+                    continue
+                removed = list(executor.map(remove, garbage))
+                MediaBlob.objects.filter(name__in=removed).delete()
+        action = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(f'Просмотрено файлов: {scanned}. {action} '
+                          f'неиспользуемых: {orphans} ({size} байт).')
@@ -0,0 +1,44 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from api.constants import JSONL_CHUNK_SIZE
+from recipes.jsonl import import_lines
+
+
+class Command(BaseCommand):
+    help = """Загружает рецепты из JSON Lines, выгруженного export_recipes.
+
+    Авторы ищутся по email, теги по slug, недостающие ингредиенты
+    создаются. Файлы изображений нужно перенести отдельно. После каждой
+    пачки позиция сохраняется в <файл>.checkpoint, и повторный запуск
+    продолжает с нее."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('filepath', type=str, help="путь до файла")
+        parser.add_argument('--batch-size', type=int,
+                            default=JSONL_CHUNK_SIZE)
+        parser.add_argument('--restart', action='store_true',
+                            help='начать заново, игнорируя checkpoint')
+
+    def handle(self, *args, **kwargs):
+        filepath = kwargs['filepath']
+        checkpoint_path = f'{filepath}.checkpoint'
+        start = 0
+        if os.path.exists(checkpoint_path) and not kwargs['restart']:
+            with open(checkpoint_path) as checkpoint_file:
+                start = json.load(checkpoint_file)['line']
+            print(f'Продолжение со строки {start}')
+
+        def checkpoint(line):
+            with open(checkpoint_path, 'w') as checkpoint_file:
+                json.dump({'line': line}, checkpoint_file)
+
+        with open(filepath, 'r', encoding='utf-8') as jsonl_file:
+            read, created = import_lines(jsonl_file, kwargs['batch_size'],
+                                         start, checkpoint)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        print(f'Было создано рецептов: {created}, пропущено '
+              f'без автора или уже загруженных: {read - created}')
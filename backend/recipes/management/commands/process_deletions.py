@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.constants import DELETION_BATCH_SIZE
+from recipes import deletion
+from recipes.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = """Удаляет скрытых пользователей и рецепты вместе со связанными
+    данными пачками (запускать по расписанию)"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=DELETION_BATCH_SIZE)
+        parser.add_argument('--limit', type=int,
+                            help='сколько задач обработать за запуск')
+
+    def handle(self, *args, **options):
+        jobs = DeletionJob.objects.exclude(status=DeletionJob.DONE)
+        if options['limit']:
+            jobs = jobs[:options['limit']]
+        for job in jobs:
+            deletion.run(job, options['batch_size'])
+            job.refresh_from_db()
+            self.stdout.write(f'{job}: удалено строк {job.deleted}.')
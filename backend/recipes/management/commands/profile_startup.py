@@ -0,0 +1,97 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.warmup import WRITE_PATH_MODULES
+
+STARTUP = """
+import django
+django.setup()
+import foodgram_backend.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+"""
+
+MEMORY = """
+import json, resource, sys, tracemalloc
+tracemalloc.start()
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+{startup}
+paths = sorted((p for p in sys.path if p), key=len, reverse=True)
+packages = {{}}
+for stat in tracemalloc.take_snapshot().statistics('filename'):
+    filename = stat.traceback[0].filename
+    root = next((p for p in paths if filename.startswith(p + '/')), None)
+    package = (filename[len(root) + 1:].split('/')[0].split('.')[0]
+               if root else filename)
+    packages[package] = packages.get(package, 0) + stat.size
+print(json.dumps({{
+    'baseline_kb': baseline,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'packages': packages,
+}}))
+"""
+
+IMPORT_TIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+class Command(BaseCommand):
+    help = """Показывает, сколько времени и памяти занимает запуск
+    воркера: импорт по модулям и пакетам и прирост памяти по пакетам"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--with-write-path', action='store_true',
+                            help='импортировать и модули, которые '
+                                 'загружаются лениво при первой записи')
+
+    def run_child(self, code, *flags):
+        env = dict(os.environ,
+                   DJANGO_SETTINGS_MODULE=os.environ.get(
+                       'DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings'))
+        return subprocess.run(
+            [sys.executable, *flags, '-c', code], env=env,
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True)
+
+    def handle(self, *args, **options):
+        startup = STARTUP
+        if options['with_write_path']:
+            startup += ''.join(f'import {module}\n'
+                               for module in WRITE_PATH_MODULES)
+        top = options['top']
+
+        modules, packages = [], defaultdict(int)
+        stderr = self.run_child(startup, '-X', 'importtime').stderr
+        for self_us, cumulative_us, indent, module in IMPORT_TIME.findall(
+                stderr):
+            modules.append((int(cumulative_us), module, len(indent) // 2))
+            packages[module.split('.')[0]] += int(self_us)
+        total = sum(packages.values())
+        self.stdout.write(f'Импорт: {total / 1000:.1f} мс, '
+                          f'{len(modules)} модулей.\n')
+        self.stdout.write('Пакеты (собственное время):')
+        for package, spent in sorted(packages.items(),
+                                     key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {spent / 1000:8.1f} мс  {package}')
+        self.stdout.write('\nМодули верхнего уровня (с зависимостями):')
+        roots = sorted((item for item in modules if item[2] <= 1),
+                       reverse=True)
+        for spent, module, _ in roots[:top]:
+            self.stdout.write(f'  {spent / 1000:8.1f} мс  {module}')
+
+        memory = json.loads(self.run_child(
+            MEMORY.format(startup=startup)).stdout.splitlines()[-1])
+        self.stdout.write(
+            f'\nПамять: пик RSS {memory["rss_kb"] / 1024:.1f} МБ '
+            f'(интерпретатор {memory["baseline_kb"] / 1024:.1f} МБ).')
+        self.stdout.write('Пакеты (выделено при импорте):')
+        for package, size in sorted(memory['packages'].items(),
+                                    key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {size / 1024:8.1f} КБ  {package}')
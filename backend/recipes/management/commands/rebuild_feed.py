@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes import feed
+from recipes.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = """Заново заполняет ленты подписок (нужно при переключении
+    RECIPES_FEED_BACKEND на timeline)"""
+
+    def handle(self, *args, **options):
+        feed.rebuild()
+        self.stdout.write(f'Записей в лентах: {FeedEntry.objects.count()}')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from recipes import usage
+
+
+class Command(BaseCommand):
+    help = """Пересчитывает статистику использования ингредиентов; при
+    смене INGREDIENT_USAGE_STORAGE пересоздает ее в новом хранилище"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recreate', action='store_true',
+                            help='удалить и создать статистику заново')
+
+    def handle(self, *args, **options):
+        if options['recreate']:
+            usage.create()
+        else:
+            usage.refresh()
+        storage = ('материализованное представление'
+                   if usage.storage() == usage.MATVIEW else 'таблица')
+        self.stdout.write(f'Статистика ингредиентов обновлена ({storage}).')
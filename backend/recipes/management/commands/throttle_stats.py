@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.throttling import get_stats
+
+
+class Command(BaseCommand):
+    help = """Показывает счетчики пропущенных и отклоненных запросов
+    по областям троттлинга"""
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        scopes = sorted({key.rsplit(':', 1)[0] for key in stats})
+        for scope in scopes:
+            self.stdout.write(f'{scope:<16} '
+                              f'пропущено {stats.get(scope + ":allowed", 0)}'
+                              f'  отклонено {stats.get(scope + ":denied", 0)}')
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.constants import CART_TOTALS_CHUNK_SIZE
+from recipes import cart
+from recipes.models import CartIngredient, ShoppingCart
+
+
+class Command(BaseCommand):
+    help = """Сверяет сохраненные итоги списков покупок с пересчетом
+    по RecipeIngredient и при --repair исправляет расхождения"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true',
+                            help='перезаписать итоги с расхождениями')
+        parser.add_argument('--chunk-size', type=int,
+                            default=CART_TOTALS_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        user_ids = sorted(
+            set(ShoppingCart.objects.values_list('user_id', flat=True))
+            | set(CartIngredient.objects.values_list('user_id', flat=True)))
+        drifted = 0
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            with transaction.atomic():
+                expected = cart.expected_totals(chunk)
+                actual = cart.actual_totals(chunk)
+                broken = {user_id for user_id, _ in
+                          expected.keys() ^ actual.keys()}
+                broken.update(key[0] for key, amount in expected.items()
+                              if actual.get(key) != amount)
+                drifted += len(broken)
+                if broken and options['repair']:
+                    cart.rebuild(list(broken), {
+                        key: amount for key, amount in expected.items()
+                        if key[0] in broken})
+        action = 'исправлено' if options['repair'] else 'найдено'
+        self.stdout.write(f'Проверено пользователей: {len(user_ids)}, '
+                          f'расхождений {action}: {drifted}')
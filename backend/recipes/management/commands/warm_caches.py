@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+from django.test import RequestFactory
+
+from api import representations
+from api.constants import (WARMUP_PAGE_LIMIT, WARMUP_PAGES,
+                           WARMUP_POPULAR_RECIPES, WARMUP_WORKERS)
+from api.views import RecipesViewSet
+from recipes import coalescing
+from recipes.models import Recipes
+from recipes.registry import reference_data
+
+
+class Command(BaseCommand):
+    help = """Заполняет кеши перед приходом трафика: справочники, первые
+    страницы списка рецептов для анонимов (без фильтра, по одному тегу и
+    по всем тегам, как их запрашивает фронтенд) и карточки самых
+    популярных рецептов"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=WARMUP_PAGES)
+        parser.add_argument('--limit', type=int, default=WARMUP_PAGE_LIMIT)
+        parser.add_argument('--recipes', type=int,
+                            default=WARMUP_POPULAR_RECIPES,
+                            help='сколько популярных рецептов прогреть')
+        parser.add_argument('--tag-pairs', action='store_true',
+                            help='прогреть и все пары тегов')
+        parser.add_argument('--workers', type=int, default=WARMUP_WORKERS)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        reference_data.refresh(force=True)
+        self.report('справочники', 1, started)
+
+        host = urlsplit(settings.SITE_URL).netloc or 'localhost'
+        secure = urlsplit(settings.SITE_URL).scheme == 'https'
+        urls = self.list_urls(options)
+        popular = list(Recipes.objects.annotate(
+            popularity=Count('favorites', distinct=True)
+            + Count('shoppingcart', distinct=True)
+        ).order_by('-popularity', '-pub_date').values_list(
+            'id', flat=True)[:options['recipes']])
+
+        # Страницы строит само представление, минуя middleware и
+        # ограничение частоты: иначе прогрев выбрал бы лимит анонима
+        list_view = RecipesViewSet.as_view({'get': 'list'},
+                                           throttle_classes=())
+        factory = RequestFactory(HTTP_HOST=host)
+
+        def get_page(url):
+            try:
+                return list_view(factory.get(url, secure=secure)).status_code
+            finally:
+                connections.close_all()
+
+        def get_recipe(pk):
+            try:
+                return coalescing.get_or_compute(
+                    coalescing.RECIPE_DETAIL_KEY.format(pk),
+                    lambda: representations.shared_recipe(pk),
+                    settings.RECIPE_DETAIL_FRESH_SECONDS,
+                    settings.RECIPE_DETAIL_STALE_SECONDS)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            step = time.perf_counter()
+            statuses = list(pool.map(get_page, urls))
+            failed = sum(status != 200 for status in statuses)
+            self.report('страницы списка', len(urls), step, failed)
+            step = time.perf_counter()
+            list(pool.map(get_recipe, popular))
+            self.report('карточки рецептов', len(popular), step)
+        self.stdout.write(
+            f'Всего: {time.perf_counter() - started:.2f} с')
+
+    def list_urls(self, options):
+        slugs = sorted(tag.slug for tag in reference_data.get_tags())
+        filters = [()] + [(slug,) for slug in slugs]
+        if options['tag_pairs']:
+            filters += list(combinations(slugs, 2))
+        if len(slugs) > 1:
+            filters.append(tuple(slugs))
+        return [
+            '/api/recipes/?' + urlencode(
+                [('page', page), ('limit', options['limit'])]
+                + [('tags', slug) for slug in tags])
+            for tags in dict.fromkeys(filters)
+            for page in range(1, options['pages'] + 1)]
+
+    def report(self, name, count, started, failed=0):
+        errors = f', с ошибкой: {failed}' if failed else ''
+        self.stdout.write(f'{name:<20} {count:5} за '
+                          f'{time.perf_counter() - started:.2f} с{errors}')
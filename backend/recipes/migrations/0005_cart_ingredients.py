@@ -0,0 +1,50 @@
+# Generated by Django 3.2 on 2026-10-19 19:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def fill_cart_ingredients(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    CartIngredient = apps.get_model('recipes', 'CartIngredient')
+    totals = RecipeIngredient.objects.values_list(
+        'recipe__shoppingcart__user_id', 'ingredient_id'
+    ).filter(recipe__shoppingcart__isnull=False).annotate(
+        total=Sum('amount')).order_by()
+    CartIngredient.objects.bulk_create(
+        (CartIngredient(user_id=user_id, ingredient_id=ingredient_id,
+                        amount=total)
+         for user_id, ingredient_id, total in totals.iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0004_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(default=0, verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredients')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_ingredients', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списках покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cartingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_cart_ingredient'),
+        ),
+        migrations.RunPython(fill_cart_ingredients,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2 on 2026-10-19 19:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_media_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSignature',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='recipes.recipes')),
+                ('signature', models.BinaryField(verbose_name='MinHash-сигнатура')),
+            ],
+            options={
+                'verbose_name': 'Сигнатура рецепта',
+                'verbose_name_plural': 'Сигнатуры рецептов',
+            },
+        ),
+        migrations.CreateModel(
+            name='SignatureBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='Полоса')),
+                ('bucket', models.BigIntegerField(verbose_name='Корзина')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_buckets', to='recipes.recipes')),
+            ],
+            options={
+                'verbose_name': 'Корзина LSH',
+                'verbose_name_plural': 'Корзины LSH',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeDuplicate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField(verbose_name='Сходство')),
+                ('original', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicates', to='recipes.recipes', verbose_name='Оригинал')),
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_of', to='recipes.recipes', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Вероятный дубликат',
+                'verbose_name_plural': 'Вероятные дубликаты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='signaturebucket',
+            index=models.Index(fields=['band', 'bucket'], name='signature_bucket_idx'),
+        ),
+    ]
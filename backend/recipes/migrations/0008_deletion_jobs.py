@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-19 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_minhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('recipe', 'Рецепт')], max_length=16, verbose_name='Что удаляется')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершено')], default='pending', max_length=16, verbose_name='Статус')),
+                ('step', models.CharField(blank=True, max_length=128, verbose_name='Текущий шаг')),
+                ('deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено строк')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Дата завершения')),
+            ],
+            options={
+                'verbose_name': 'Задача удаления',
+                'verbose_name_plural': 'Задачи удаления',
+                'ordering': ('created',),
+            },
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='is_hidden',
+            field=models.BooleanField(default=False, verbose_name='Скрыт до удаления'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-19 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_deletion_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('recipe', 'Рецепт'), ('favorite', 'Избранное'), ('cart', 'Список покупок')], max_length=16, verbose_name='Объект')),
+                ('action', models.CharField(choices=[('upsert', 'Создание или изменение'), ('delete', 'Удаление'), ('compacted', 'Граница сжатия')], max_length=16, verbose_name='Действие')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id рецепта')),
+                ('user_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='id пользователя')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата')),
+            ],
+            options={
+                'verbose_name': 'Запись журнала изменений',
+                'verbose_name_plural': 'Журнал изменений',
+                'ordering': ('seq',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['kind', 'object_id', 'user_id'], name='changelog_object_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 3.2 on 2026-10-19 20:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+CREATE_USAGE = """
+CREATE TABLE recipes_ingredientusage (
+    ingredient_id integer PRIMARY KEY,
+    recipes_count integer NOT NULL,
+    carts_count integer NOT NULL
+)
+"""
+
+FILL_USAGE = """
+INSERT INTO recipes_ingredientusage
+    (ingredient_id, recipes_count, carts_count)
+SELECT ingredient.id,
+       (SELECT COUNT(*)
+        FROM recipes_recipeingredient AS item
+        WHERE item.ingredient_id = ingredient.id),
+       (SELECT COUNT(*)
+        FROM recipes_cartingredient AS cart
+        WHERE cart.ingredient_id = ingredient.id)
+FROM recipes_ingredients AS ingredient
+"""
+
+
+def create_usage(apps, schema_editor):
+    schema_editor.execute(CREATE_USAGE)
+    schema_editor.execute(FILL_USAGE)
+
+
+def drop_usage(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        tables = {info.name: info.type for info
+                  in connection.introspection.get_table_list(cursor)}
+    kind = tables.get('recipes_ingredientusage')
+    if kind == 'v':
+        schema_editor.execute(
+            'DROP MATERIALIZED VIEW recipes_ingredientusage')
+    elif kind is not None:
+        schema_editor.execute('DROP TABLE recipes_ingredientusage')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientUsage',
+            fields=[
+                ('ingredient', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='usage', serialize=False, to='recipes.ingredients', verbose_name='Ингредиент')),
+                ('recipes_count', models.PositiveIntegerField(verbose_name='Рецептов')),
+                ('carts_count', models.PositiveIntegerField(verbose_name='Списков покупок')),
+            ],
+            options={
+                'verbose_name': 'Использование ингредиента',
+                'verbose_name_plural': 'Использование ингредиентов',
+                'db_table': 'recipes_ingredientusage',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_usage, drop_usage),
+    ]
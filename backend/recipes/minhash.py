@@ -0,0 +1,136 @@
+import hashlib
+import re
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from api.constants import (DUPLICATE_SIMILARITY, MINHASH_BANDS,
+                           MINHASH_PERMUTATIONS, MINHASH_SHINGLE_SIZE)
+from recipes.models import (RecipeDuplicate, RecipeIngredient, Recipes,
+                            RecipeSignature, SignatureBucket)
+
+# Перестановки вида (a * x + b) mod p над 32-битными хешами шинглов:
+# a < 2^31 и x < 2^32, поэтому произведение помещается в uint64.
+PRIME = (1 << 61) - 1
+_random = np.random.RandomState(20240601)
+A = _random.randint(1, 1 << 31, MINHASH_PERMUTATIONS).astype(np.uint64)
+B = _random.randint(0, 1 << 31, MINHASH_PERMUTATIONS).astype(np.uint64)
+ROWS = MINHASH_PERMUTATIONS // MINHASH_BANDS
+WORD = re.compile(r'\w+')
+
+
+def shingles(name, text, ingredient_ids):
+    """Ингредиенты рецепта и словесные n-граммы названия и описания."""
+    result = {f'i:{pk}' for pk in ingredient_ids}
+    words = WORD.findall(f'{name} {text}'.lower())
+    size = min(MINHASH_SHINGLE_SIZE, len(words))
+    result.update('w:' + ' '.join(words[i:i + size])
+                  for i in range(len(words) - size + 1) if size)
+    return result
+
+
+def signature(shingles):
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode(),
+                                        digest_size=4).digest(), 'little')
+         for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    if not len(hashes):
+        return np.full(MINHASH_PERMUTATIONS, 0xffffffff, dtype=np.uint32)
+    values = (np.outer(hashes, A) + B) % PRIME
+    return (values & 0xffffffff).min(axis=0).astype(np.uint32)
+
+
+def buckets(sig):
+    """Хеш каждой полосы из ROWS значений: похожие рецепты с высокой
+    вероятностью совпадают хотя бы в одной полосе."""
+    result = []
+    for band in range(MINHASH_BANDS):
+        digest = hashlib.blake2b(
+            sig[band * ROWS:(band + 1) * ROWS].tobytes(),
+            digest_size=8).digest()
+        result.append((band, int.from_bytes(digest, 'little', signed=True)))
+    return result
+
+
+def similarity(sig, other):
+    """Оценка коэффициента Жаккара по доле совпавших минимумов."""
+    return float(np.mean(sig == other))
+
+
+def from_bytes(value):
+    return np.frombuffer(bytes(value), dtype=np.uint32)
+
+
+def recipe_signature(recipe):
+    ingredient_ids = RecipeIngredient.objects.filter(
+        recipe_id=recipe.id).values_list('ingredient_id', flat=True)
+    return signature(shingles(recipe.name, recipe.text, ingredient_ids))
+
+
+def store(recipe_id, sig):
+    RecipeSignature.objects.update_or_create(
+        recipe_id=recipe_id, defaults={'signature': sig.tobytes()})
+    SignatureBucket.objects.filter(recipe_id=recipe_id).delete()
+    SignatureBucket.objects.bulk_create(
+        SignatureBucket(recipe_id=recipe_id, band=band, bucket=bucket)
+        for band, bucket in buckets(sig))
+
+
+def find_similar(sig, exclude=None, threshold=DUPLICATE_SIMILARITY):
+    """Рецепты, попавшие с sig в общую корзину хотя бы одной полосы и
+    прошедшие проверку по сигнатуре: [(recipe_id, сходство)] по убыванию
+    сходства. Просматриваются только кандидаты из корзин, а не вся
+    таблица."""
+    query = Q()
+    for band, bucket in buckets(sig):
+        query |= Q(band=band, bucket=bucket)
+    candidates = SignatureBucket.objects.filter(query).exclude(
+        recipe_id=exclude).values('recipe_id').distinct()
+    found = [
+        (recipe_id, similarity(sig, from_bytes(value)))
+        for recipe_id, value in RecipeSignature.objects.filter(
+            recipe_id__in=candidates).values_list('recipe_id', 'signature')
+    ]
+    return sorted(((recipe_id, score) for recipe_id, score in found
+                   if score >= threshold), key=lambda item: -item[1])
+
+
+@transaction.atomic
+def index_recipe(recipe):
+    """Обновляет сигнатуру рецепта и отмечает его как вероятный дубликат
+    самого похожего более раннего рецепта."""
+    sig = recipe_signature(recipe)
+    originals = [(recipe_id, score)
+                 for recipe_id, score in find_similar(sig, exclude=recipe.id)
+                 if recipe_id < recipe.id]
+    store(recipe.id, sig)
+    if originals:
+        original_id, score = originals[0]
+        RecipeDuplicate.objects.update_or_create(
+            recipe_id=recipe.id,
+            defaults={'original_id': original_id, 'similarity': score})
+    else:
+        RecipeDuplicate.objects.filter(recipe_id=recipe.id).delete()
+    return originals
+
+
+def index_recipes(recipe_ids):
+    """Индексирует рецепты по возрастанию id: дубликат внутри пачки
+    ссылается на более ранний рецепт."""
+    for recipe in Recipes.all_objects.filter(pk__in=recipe_ids).order_by(
+            'pk'):
+        index_recipe(recipe)
+
+
+def signatures_for(recipes):
+    """Сигнатуры пачки рецептов без запроса на каждый рецепт."""
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=[recipe['id'] for recipe in recipes]).values_list(
+                'recipe_id', 'ingredient_id'):
+        ingredients[recipe_id].append(ingredient_id)
+    return {recipe['id']: signature(shingles(
+        recipe['name'], recipe['text'], ingredients[recipe['id']]))
+        for recipe in recipes}
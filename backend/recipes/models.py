@@ -39,6 +39,13 @@ class Ingredients(models.Model):
         return self.name
 
 
+class VisibleRecipesManager(models.Manager):
+    """Скрытые рецепты ждут удаления и не показываются."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_hidden=False)
+
+
 class Recipes(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='recipes',
@@ -64,11 +71,20 @@ class Recipes(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True,
     )
+    is_hidden = models.BooleanField(default=False,
+                                    verbose_name='Скрыт до удаления')
+
+    objects = VisibleRecipesManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=['author', '-pub_date'],
+                         name='recipes_author_pub_date_idx')
+        ]
 
     def __str__(self):
         return self.name
@@ -119,3 +135,248 @@ class ShoppingCart(BaseFavoriteOrShoppingCart):
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+
+
+class RecipeSimilarity(models.Model):
+    recipe = models.ForeignKey(Recipes, on_delete=models.CASCADE,
+                               related_name='similarities')
+    similar = models.ForeignKey(Recipes, on_delete=models.CASCADE,
+                                related_name='similar_to')
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'similar'],
+                                    name='unique_recipe_similar')
+        ]
+        indexes = [
+            models.Index(fields=['recipe', '-score'],
+                         name='recipe_similarity_score_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar}'
+
+
+class Recommendation(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='recommendations')
+    recipe = models.ForeignKey(Recipes, on_delete=models.CASCADE,
+                               related_name='recommended_to')
+    score = models.FloatField(verbose_name='Релевантность')
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_user_recommendation')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'],
+                         name='recommendation_score_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} для {self.user}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    recipe = models.ForeignKey(Recipes, on_delete=models.CASCADE,
+                               related_name='feed_entries')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date'],
+                         name='feed_entry_user_pub_date_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class CartIngredient(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='cart_ingredients')
+    ingredient = models.ForeignKey(Ingredients, on_delete=models.CASCADE)
+    amount = models.IntegerField(default=0, verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_cart_ingredient')
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} ({self.amount}) у {self.user}'
+
+
+class MediaBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True,
+                            verbose_name='Путь к файлу')
+    references = models.PositiveIntegerField(default=0,
+                                             verbose_name='Ссылок')
+
+    class Meta:
+        verbose_name = 'Медиафайл'
+        verbose_name_plural = 'Медиафайлы'
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeSignature(models.Model):
+    recipe = models.OneToOneField(Recipes, on_delete=models.CASCADE,
+                                  primary_key=True,
+                                  related_name='signature')
+    signature = models.BinaryField(verbose_name='MinHash-сигнатура')
+
+    class Meta:
+        verbose_name = 'Сигнатура рецепта'
+        verbose_name_plural = 'Сигнатуры рецептов'
+
+    def __str__(self):
+        return f'Сигнатура {self.recipe_id}'
+
+
+class SignatureBucket(models.Model):
+    recipe = models.ForeignKey(Recipes, on_delete=models.CASCADE,
+                               related_name='signature_buckets')
+    band = models.PositiveSmallIntegerField(verbose_name='Полоса')
+    bucket = models.BigIntegerField(verbose_name='Корзина')
+
+    class Meta:
+        verbose_name = 'Корзина LSH'
+        verbose_name_plural = 'Корзины LSH'
+        indexes = [
+            models.Index(fields=['band', 'bucket'],
+                         name='signature_bucket_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.band}/{self.bucket}'
+
+
+class RecipeDuplicate(models.Model):
+    recipe = models.OneToOneField(Recipes, on_delete=models.CASCADE,
+                                  related_name='duplicate_of',
+                                  verbose_name='Рецепт')
+    original = models.ForeignKey(Recipes, on_delete=models.CASCADE,
+                                 related_name='duplicates',
+                                 verbose_name='Оригинал')
+    similarity = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Вероятный дубликат'
+        verbose_name_plural = 'Вероятные дубликаты'
+
+    def __str__(self):
+        return f'{self.recipe} похож на {self.original}'
+
+
+class DeletionJob(models.Model):
+    USER = 'user'
+    RECIPE = 'recipe'
+    KINDS = ((USER, 'Пользователь'), (RECIPE, 'Рецепт'))
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    STATUSES = ((PENDING, 'В очереди'), (RUNNING, 'Выполняется'),
+                (DONE, 'Завершено'))
+
+    kind = models.CharField(max_length=16, choices=KINDS,
+                            verbose_name='Что удаляется')
+    object_id = models.PositiveIntegerField(verbose_name='id объекта')
+    status = models.CharField(max_length=16, choices=STATUSES,
+                              default=PENDING, verbose_name='Статус')
+    step = models.CharField(max_length=128, blank=True,
+                            verbose_name='Текущий шаг')
+    deleted = models.PositiveIntegerField(default=0,
+                                          verbose_name='Удалено строк')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата создания')
+    finished = models.DateTimeField(null=True, blank=True,
+                                    verbose_name='Дата завершения')
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Задача удаления'
+        verbose_name_plural = 'Задачи удаления'
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id}: {self.status}'
+
+
+class ChangeLogEntry(models.Model):
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    CART = 'cart'
+    KINDS = ((RECIPE, 'Рецепт'), (FAVORITE, 'Избранное'),
+             (CART, 'Список покупок'))
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    COMPACTED = 'compacted'
+    ACTIONS = ((UPSERT, 'Создание или изменение'), (DELETE, 'Удаление'),
+               (COMPACTED, 'Граница сжатия'))
+
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=16, choices=KINDS,
+                            verbose_name='Объект')
+    action = models.CharField(max_length=16, choices=ACTIONS,
+                              verbose_name='Действие')
+    object_id = models.PositiveIntegerField(verbose_name='id рецепта')
+    user_id = models.PositiveIntegerField(null=True, blank=True,
+                                          verbose_name='id пользователя')
+    created = models.DateTimeField(auto_now_add=True, db_index=True,
+                                   verbose_name='Дата')
+
+    class Meta:
+        ordering = ('seq',)
+        verbose_name = 'Запись журнала изменений'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = [
+            models.Index(fields=['kind', 'object_id', 'user_id'],
+                         name='changelog_object_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.seq}: {self.kind} {self.object_id} {self.action}'
+
+
+class IngredientUsage(models.Model):
+    """Сколько видимых рецептов и списков покупок содержат ингредиент.
+
+    Таблицу или материализованное представление создает и обновляет
+    recipes.usage, поэтому модель не управляется миграциями.
+    """
+    ingredient = models.OneToOneField(Ingredients, primary_key=True,
+                                      on_delete=models.DO_NOTHING,
+                                      db_constraint=False,
+                                      related_name='usage',
+                                      verbose_name='Ингредиент')
+    recipes_count = models.PositiveIntegerField(verbose_name='Рецептов')
+    carts_count = models.PositiveIntegerField(
+        verbose_name='Списков покупок')
+
+    class Meta:
+        managed = False
+        db_table = 'recipes_ingredientusage'
+        verbose_name = 'Использование ингредиента'
+        verbose_name_plural = 'Использование ингредиентов'
+
+    def __str__(self):
+        return f'{self.ingredient_id}: {self.recipes_count}'
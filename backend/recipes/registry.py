@@ -0,0 +1,156 @@
+import bisect
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api.constants import REFERENCE_DATA_CACHE_SECONDS
+from recipes import coalescing
+from recipes.models import Ingredients, Tags
+
+VERSION_KEY = 'reference-data:version'
+ROWS_KEY = 'reference-data:{}'
+
+
+class TagRecord:
+    __slots__ = ('id', 'name', 'slug')
+
+    def __init__(self, id, name, slug):
+        self.id, self.name, self.slug = id, name, slug
+
+    def as_dict(self):
+        return {'id': self.id, 'name': self.name, 'slug': self.slug}
+
+
+class IngredientRecord:
+    __slots__ = ('id', 'name', 'measurement_unit')
+
+    def __init__(self, id, name, measurement_unit):
+        self.id, self.name = id, name
+        self.measurement_unit = measurement_unit
+
+    def as_dict(self):
+        return {'id': self.id, 'name': self.name,
+                'measurement_unit': self.measurement_unit}
+
+
+def to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch_rows():
+    tags = Tags.objects.values_list('id', 'name', 'slug').order_by('id')
+    ingredients = Ingredients.objects.values_list(
+        'id', 'name', 'measurement_unit').order_by('id')
+    return list(tags), list(ingredients)
+
+
+class ReferenceData:
+    """Теги и ингредиенты в памяти воркера.
+
+    Таблицы загружаются целиком один раз; изменения в любом процессе
+    меняют версию в общем кеше, и воркеры перечитывают данные, заметив
+    новую версию (проверка не чаще REFERENCE_DATA_CHECK_SECONDS).
+    Строки новой версии читает из базы один процесс, остальные берут их
+    из кеша.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked = 0
+        self.tags = {}
+        self.tags_by_slug = {}
+        self.ingredients = {}
+        self.ingredient_names = []
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        interval = settings.REFERENCE_DATA_CHECK_SECONDS
+        if (not force and self.version is not None
+                and now - self.checked < interval):
+            return
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.load(version)
+                    self.version = version
+        self.checked = now
+
+    def load(self, version):
+        tag_rows, ingredient_rows = coalescing.get_or_compute(
+            ROWS_KEY.format(version), fetch_rows,
+            REFERENCE_DATA_CACHE_SECONDS)
+        tags = {pk: TagRecord(pk, name, slug)
+                for pk, name, slug in tag_rows}
+        ingredients = {pk: IngredientRecord(pk, name, unit)
+                       for pk, name, unit in ingredient_rows}
+        self.tags_by_slug = {tag.slug: tag for tag in tags.values()}
+        self.ingredient_names = sorted(
+            (ingredient.name, ingredient.id)
+            for ingredient in ingredients.values())
+        self.tags, self.ingredients = tags, ingredients
+
+    def lookup(self, table, key):
+        """Промах может означать, что запись создана в другом процессе
+        и версия еще не перепроверялась."""
+        self.refresh()
+        record = getattr(self, table).get(key)
+        if record is None:
+            self.refresh(force=True)
+            record = getattr(self, table).get(key)
+        return record
+
+    def get_tags(self):
+        self.refresh()
+        return list(self.tags.values())
+
+    def get_tag(self, pk):
+        return self.lookup('tags', to_id(pk))
+
+    def get_tag_by_slug(self, slug):
+        return self.lookup('tags_by_slug', slug)
+
+    def get_ingredient(self, pk):
+        return self.lookup('ingredients', to_id(pk))
+
+    def find_ingredients(self, prefix='', search=''):
+        """Ингредиенты, чье название начинается с prefix (с учетом
+        регистра) и содержит все слова search (без учета регистра)."""
+        self.refresh()
+        if prefix:
+            names = self.ingredient_names
+            start = bisect.bisect_left(names, (prefix,))
+            end = bisect.bisect_left(names, (prefix + '\U0010ffff',))
+            found = sorted(pk for _, pk in names[start:end])
+            found = [self.ingredients[pk] for pk in found]
+        else:
+            found = list(self.ingredients.values())
+        terms = search.replace(',', ' ').lower().split()
+        if terms:
+            found = [ingredient for ingredient in found
+                     if all(term in ingredient.name.lower()
+                            for term in terms)]
+        return found
+
+
+reference_data = ReferenceData()
+
+
+def bump_version():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+    reference_data.checked = 0
+
+
+def invalidate():
+    transaction.on_commit(bump_version)
@@ -0,0 +1,138 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from recipes import (cart, changelog, coalescing, feed, registry,
+                     syndication, usage, writes)
+from recipes.models import (ChangeLogEntry, Favorites, Ingredients, Recipes,
+                            ShoppingCart, Tags)
+from users.models import Subscriptions, User
+
+MEDIA_FIELDS = {Recipes: 'image', User: 'avatar'}
+# Поля пользователя, которые видны в списках и карточках рецептов
+PROFILE_FIELDS = {'email', 'username', 'first_name', 'last_name', 'avatar'}
+
+
+def delete_file_on_commit(name):
+    if name:
+        transaction.on_commit(lambda: default_storage.delete(name))
+
+
+@receiver(pre_save, sender=Recipes)
+@receiver(pre_save, sender=User)
+def media_replaced(sender, instance, update_fields, **kwargs):
+    field = MEDIA_FIELDS[sender]
+    if instance._state.adding or (
+            update_fields is not None and field not in update_fields):
+        return
+    old = sender._base_manager.filter(pk=instance.pk).values_list(
+        field, flat=True).first()
+    if old != getattr(instance, field).name:
+        delete_file_on_commit(old)
+
+
+@receiver(post_delete, sender=Recipes)
+@receiver(post_delete, sender=User)
+def media_owner_deleted(sender, instance, **kwargs):
+    delete_file_on_commit(getattr(instance, MEDIA_FIELDS[sender]).name)
+
+
+@receiver(post_save, sender=Recipes)
+def recipe_saved(sender, instance, created, raw, **kwargs):
+    # raw — загрузка как есть (loaddata, импорт): хук вызывает загрузчик
+    if not raw:
+        writes.recipes_written([instance], created=created)
+
+
+@receiver(m2m_changed, sender=Recipes.tags.through)
+def recipe_tags_changed(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        changelog.record(ChangeLogEntry.RECIPE, ChangeLogEntry.UPSERT,
+                         instance.id)
+        coalescing.expire_recipes([instance.id])
+
+
+@receiver(post_delete, sender=Recipes)
+def recipe_deleted(sender, instance, **kwargs):
+    coalescing.forget_recipes([instance.id])
+    transaction.on_commit(
+        lambda: syndication.invalidate([instance.author_id]))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    if created:
+        coalescing.bump_lists(coalescing.USER_LIST)
+        return
+    if update_fields is not None and not set(update_fields) & PROFILE_FIELDS:
+        return
+    coalescing.bump_lists(coalescing.USER_LIST)
+    # Автор встроен в карточки его рецептов и анонимные страницы списка
+    coalescing.expire_recipes(list(Recipes.objects.filter(
+        author=instance).values_list('pk', flat=True)))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    coalescing.bump_lists(coalescing.USER_LIST)
+
+
+@receiver(post_save, sender=Subscriptions)
+def subscription_saved(sender, instance, created, **kwargs):
+    coalescing.bump_lists(coalescing.USER_LISTS.format(instance.subscriber_id))
+    if created and feed.timeline_enabled():
+        feed.backfill(instance.subscriber_id, instance.subscribed_to_id)
+
+
+@receiver(post_delete, sender=Subscriptions)
+def subscription_deleted(sender, instance, **kwargs):
+    coalescing.bump_lists(coalescing.USER_LISTS.format(instance.subscriber_id))
+    if feed.timeline_enabled():
+        feed.unfollow(instance.subscriber_id, instance.subscribed_to_id)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_item_saved(sender, instance, created, **kwargs):
+    if created:
+        cart.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def cart_item_deleted(sender, instance, **kwargs):
+    cart.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+CHANGELOG_KINDS = {Favorites: ChangeLogEntry.FAVORITE,
+                   ShoppingCart: ChangeLogEntry.CART}
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_save, sender=ShoppingCart)
+def user_list_item_saved(sender, instance, created, **kwargs):
+    if created:
+        coalescing.bump_lists(coalescing.USER_LISTS.format(instance.user_id))
+        changelog.record(CHANGELOG_KINDS[sender], ChangeLogEntry.UPSERT,
+                         instance.recipe_id, instance.user_id)
+
+
+@receiver(post_delete, sender=Favorites)
+@receiver(post_delete, sender=ShoppingCart)
+def user_list_item_deleted(sender, instance, **kwargs):
+    coalescing.bump_lists(coalescing.USER_LISTS.format(instance.user_id))
+    changelog.record(CHANGELOG_KINDS[sender], ChangeLogEntry.DELETE,
+                     instance.recipe_id, instance.user_id)
+
+
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+def reference_data_changed(sender, **kwargs):
+    registry.invalidate()
+
+
+@receiver(post_delete, sender=Ingredients)
+def ingredient_deleted(sender, instance, **kwargs):
+    usage.forget([instance.pk])
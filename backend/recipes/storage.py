@@ -0,0 +1,63 @@
+import hashlib
+import os
+import posixpath
+from collections import Counter
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from recipes.models import MediaBlob
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под именем sha256 содержимого.
+
+    Одинаковые загрузки ложатся в один файл, число ссылок на него ведется
+    в MediaBlob; delete() удаляет файл только вместе с последней ссылкой.
+    Содержимое по имени никогда не меняется, поэтому nginx может отдавать
+    /media/ с Cache-Control: immutable.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = digest.hexdigest()
+        name = posixpath.join(directory, digest[:2], digest + extension)
+        with transaction.atomic():
+            blob, _ = MediaBlob.objects.select_for_update().get_or_create(
+                name=name)
+            if not self.exists(name):
+                name = self._save(name, content)
+            MediaBlob.objects.filter(pk=blob.pk).update(
+                references=F('references') + 1)
+        return name
+
+    def delete(self, name):
+        with transaction.atomic():
+            if MediaBlob.objects.filter(
+                name=name, references__gt=1
+            ).update(references=F('references') - 1):
+                return
+            MediaBlob.objects.filter(name=name).delete()
+            super().delete(name)
+
+
+def add_references(names):
+    """Учитывает новые ссылки на уже сохраненные файлы, например при
+    импорте рецептов. Вызывать внутри транзакции, создающей ссылки."""
+    counts = Counter(name for name in names if name)
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name) for name in counts], ignore_conflicts=True)
+    for name, count in counts.items():
+        MediaBlob.objects.filter(name=name).update(
+            references=F('references') + count)
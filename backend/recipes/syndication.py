@@ -0,0 +1,144 @@
+import hashlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+
+from api.constants import (COALESCE_LOCK_SECONDS, SYNDICATION_CACHE_SECONDS,
+                           SYNDICATION_FEED_SIZE)
+from recipes import coalescing
+from recipes.models import Recipes
+from users.models import User
+
+FORMATS = {'rss': Rss201rev2Feed, 'atom': Atom1Feed}
+
+
+def feed_name(author_id):
+    return f'syndication:{author_id or "site"}'
+
+
+def feed_key(author_id):
+    """Ключ с версией ленты: лента, собранная до invalidate, сохранится
+    под старой версией и не будет отдана."""
+    name = feed_name(author_id)
+    return f'{name}:{coalescing.list_version(name)}'
+
+
+def make_item(recipe):
+    link = f'{settings.SITE_URL}/recipes/{recipe.id}'
+    return {'id': recipe.id, 'title': recipe.name, 'link': link,
+            'unique_id': link, 'description': recipe.text,
+            'author_name': recipe.author.username,
+            'pubdate': recipe.pub_date}
+
+
+def render(feed):
+    """Готовые тела и ETag для всех форматов: при опросе ленты
+    остается только отдать строку из кеша."""
+    blobs = {}
+    for name, generator_class in FORMATS.items():
+        generator = generator_class(
+            title=feed['title'], link=feed['link'],
+            description=feed['description'], language='ru',
+            feed_url=f'{feed["feed_url"]}.{name}')
+        for item in feed['items']:
+            generator.add_item(**{key: value for key, value in item.items()
+                                  if key != 'id'})
+        body = generator.writeString('utf-8')
+        blobs[name] = (body, f'"{hashlib.md5(body.encode()).hexdigest()}"',
+                       generator.content_type)
+    feed['blobs'] = blobs
+    return feed
+
+
+def build(author_id=None):
+    recipes = Recipes.objects.select_related('author').order_by('-pub_date')
+    if author_id:
+        author = User.objects.filter(pk=author_id, is_hidden=False).first()
+        if author is None:
+            return None
+        recipes = recipes.filter(author=author)
+        feed = {'title': f'Foodgram: рецепты {author.username}',
+                'link': f'{settings.SITE_URL}/user/{author.id}',
+                'description': f'Новые рецепты автора {author.username}',
+                'feed_url': f'{settings.SITE_URL}/api/feeds/authors/'
+                            f'{author.id}'}
+    else:
+        feed = {'title': 'Foodgram', 'link': settings.SITE_URL,
+                'description': 'Новые рецепты на Foodgram',
+                'feed_url': f'{settings.SITE_URL}/api/feeds/recipes'}
+    feed['items'] = [make_item(recipe)
+                     for recipe in recipes[:SYNDICATION_FEED_SIZE]]
+    feed['updated'] = timezone.now()
+    return render(feed)
+
+
+def get_feed(author_id=None):
+    """Лента из кеша. Собранную ленту сохраняет только тот, кто взял
+    блокировку ленты: пока ее держит patch, сборка может не увидеть
+    правку и не должна попасть в кеш."""
+    key = feed_key(author_id)
+    feed = cache.get(key)
+    if feed is not None:
+        return feed
+    lock = key + ':lock'
+    locked = cache.add(lock, 1, COALESCE_LOCK_SECONDS)
+    try:
+        feed = build(author_id)
+        if feed is not None and locked:
+            cache.set(key, feed, SYNDICATION_CACHE_SECONDS)
+    finally:
+        if locked:
+            cache.delete(lock)
+    return feed
+
+
+def patch(author_id, items):
+    """Вставляет или заменяет items в закешированной ленте без запросов
+    к базе. Ленты, которых нет в кеше, соберутся при опросе. Если ленту
+    сейчас собирают или правят, ее версия сбрасывается: чужая сборка
+    сохранится под старым ключом, и следующий опрос соберет ленту
+    заново."""
+    key = feed_key(author_id)
+    lock = key + ':lock'
+    if not cache.add(lock, 1, COALESCE_LOCK_SECONDS):
+        coalescing.bump_list(feed_name(author_id))
+        return
+    try:
+        feed = cache.get(key)
+        if feed is None:
+            return
+        ids = {item['id'] for item in items}
+        merged = [old for old in feed['items'] if old['id'] not in ids]
+        merged.extend(items)
+        merged.sort(key=lambda item: item['pubdate'], reverse=True)
+        merged = merged[:SYNDICATION_FEED_SIZE]
+        if merged == feed['items']:
+            return
+        feed['items'] = merged
+        feed['updated'] = timezone.now()
+        cache.set(key, render(feed), SYNDICATION_CACHE_SECONDS)
+    finally:
+        cache.delete(lock)
+
+
+def recipes_changed(recipe_ids):
+    """После публикации или правки рецептов обновляет в общей ленте и
+    лентах авторов только их элементы."""
+    items = defaultdict(list)
+    for recipe in Recipes.objects.select_related('author').filter(
+            pk__in=recipe_ids):
+        item = make_item(recipe)
+        items[None].append(item)
+        items[recipe.author_id].append(item)
+    for author_id, author_items in items.items():
+        patch(author_id, author_items)
+
+
+def invalidate(author_ids=()):
+    """Удаленный рецепт мог быть в середине ленты: общая лента и ленты
+    авторов собираются заново при следующем опросе."""
+    for author_id in [None, *author_ids]:
+        coalescing.bump_list(feed_name(author_id))
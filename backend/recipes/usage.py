@@ -0,0 +1,166 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce
+
+from recipes.models import (CartIngredient, IngredientUsage, Ingredients,
+                            RecipeIngredient)
+
+TABLE = 'table'
+MATVIEW = 'matview'
+COLUMNS = ('ingredient_id', 'recipes_count', 'carts_count')
+
+
+def storage():
+    """Материализованное представление есть только в PostgreSQL, на
+    других базах всегда используется таблица."""
+    if (settings.INGREDIENT_USAGE_STORAGE == MATVIEW
+            and connection.vendor == 'postgresql'):
+        return MATVIEW
+    return TABLE
+
+
+def usage_query(ingredient_ids=None):
+    """SELECT с числами для всех ингредиентов или только для
+    ingredient_ids; один и тот же запрос заполняет таблицу и
+    представление. Скрытые рецепты считаются, пока process_deletions не
+    удалит их ингредиенты."""
+    recipes = RecipeIngredient.objects.filter(
+        ingredient=OuterRef('pk')
+    ).order_by().values('ingredient').annotate(
+        count=Count('recipe', distinct=True)).values('count')
+    carts = CartIngredient.objects.filter(
+        ingredient=OuterRef('pk')
+    ).order_by().values('ingredient').annotate(
+        count=Count('pk')).values('count')
+    queryset = Ingredients.objects.annotate(
+        recipes_count=Coalesce(Subquery(recipes), 0),
+        carts_count=Coalesce(Subquery(carts), 0),
+    ).order_by().values_list('id', 'recipes_count', 'carts_count')
+    if ingredient_ids is not None:
+        queryset = queryset.filter(id__in=ingredient_ids)
+    return queryset.query.sql_with_params()
+
+
+def current_kind(cursor):
+    table = IngredientUsage._meta.db_table
+    for info in connection.introspection.get_table_list(cursor):
+        if info.name == table:
+            return MATVIEW if info.type == 'v' else TABLE
+    return None
+
+
+def create():
+    """Пересоздает статистику в хранилище из INGREDIENT_USAGE_STORAGE."""
+    table = connection.ops.quote_name(IngredientUsage._meta.db_table)
+    sql, params = usage_query()
+    with transaction.atomic(), connection.cursor() as cursor:
+        remove(cursor)
+        if storage() == MATVIEW:
+            cursor.execute(
+                f'CREATE MATERIALIZED VIEW {table} AS {sql}', params)
+            # Уникальный индекс нужен для REFRESH ... CONCURRENTLY
+            cursor.execute(
+                f'CREATE UNIQUE INDEX ingredientusage_pk ON {table} '
+                f'(ingredient_id)')
+        else:
+            cursor.execute(
+                f'CREATE TABLE {table} (ingredient_id integer PRIMARY KEY, '
+                f'recipes_count integer NOT NULL, '
+                f'carts_count integer NOT NULL)')
+            insert(cursor, sql, params)
+
+
+def remove(cursor):
+    table = connection.ops.quote_name(IngredientUsage._meta.db_table)
+    kind = current_kind(cursor)
+    if kind == MATVIEW:
+        cursor.execute(f'DROP MATERIALIZED VIEW {table}')
+    elif kind == TABLE:
+        cursor.execute(f'DROP TABLE {table}')
+
+
+def drop():
+    with connection.cursor() as cursor:
+        remove(cursor)
+
+
+def insert(cursor, sql, params):
+    table = connection.ops.quote_name(IngredientUsage._meta.db_table)
+    columns = ', '.join(COLUMNS)
+    cursor.execute(f'INSERT INTO {table} ({columns}) {sql}', params)
+
+
+def refresh():
+    """Полный пересчет: представление обновляется CONCURRENTLY, не
+    блокируя чтение, таблица перезаполняется в одной транзакции."""
+    table = connection.ops.quote_name(IngredientUsage._meta.db_table)
+    with connection.cursor() as cursor:
+        kind = current_kind(cursor)
+        if kind is None or (kind == MATVIEW) != (storage() == MATVIEW):
+            create()
+        elif kind == MATVIEW:
+            cursor.execute(
+                f'REFRESH MATERIALIZED VIEW CONCURRENTLY {table}')
+        else:
+            with transaction.atomic():
+                IngredientUsage.objects.all().delete()
+                insert(cursor, *usage_query())
+
+
+def add(recipes=(), carts=()):
+    """Прибавляет к счетчикам таблицы дельты {ingredient_id: число}.
+
+    Вызывать в транзакции, изменяющей рецепты или списки покупок: строки
+    меняются через F(), поэтому параллельные правки не теряются и не
+    требуют пересчета COUNT. Строки блокируются по возрастанию
+    ingredient_id, так что встречные правки (A→B и B→A) ждут друг друга,
+    а не взаимоблокируются. Материализованное представление так не
+    обновить: его обновляет refresh_ingredient_usage по расписанию.
+    """
+    deltas = {'recipes_count': Counter(recipes),
+              'carts_count': Counter(carts)}
+    ingredient_ids = sorted({pk for counter in deltas.values()
+                             for pk, delta in counter.items() if delta})
+    if not ingredient_ids or storage() != TABLE:
+        return
+    rows = IngredientUsage.objects.filter(ingredient_id__in=ingredient_ids)
+    with transaction.atomic():
+        IngredientUsage.objects.bulk_create(
+            [IngredientUsage(ingredient_id=pk, recipes_count=0,
+                             carts_count=0)
+             for pk in ingredient_ids],
+            ignore_conflicts=True)
+        list(rows.select_for_update().order_by('ingredient_id').values_list(
+            'ingredient_id', flat=True))
+        rows.update(**{
+            field: Case(*(When(ingredient_id=pk, then=F(field) + delta)
+                          for pk, delta in counter.items() if delta),
+                        default=F(field))
+            for field, counter in deltas.items()})
+
+
+def change_recipes(old_ids, new_ids):
+    """Ингредиенты рецептов сменились с old_ids на new_ids;
+    ингредиент повторяется столько раз, во скольких рецептах он есть."""
+    deltas = Counter(new_ids)
+    deltas.subtract(old_ids)
+    add(recipes=deltas)
+
+
+def forget(ingredient_ids):
+    if storage() == TABLE:
+        IngredientUsage.objects.filter(
+            ingredient_id__in=ingredient_ids).delete()
+
+
+def by_popularity(ingredients):
+    """Ингредиенты по убыванию числа рецептов, затем списков покупок;
+    при равенстве порядок сохраняется."""
+    rows = IngredientUsage.objects.filter(
+        ingredient_id__in=[item.id for item in ingredients]
+    ).values_list(*COLUMNS)
+    counts = {pk: (-recipes, -carts) for pk, recipes, carts in rows}
+    return sorted(ingredients, key=lambda item: counts.get(item.id, (0, 0)))
@@ -0,0 +1,34 @@
+from django.db import transaction
+
+from recipes import changelog, coalescing, feed, syndication
+from recipes.models import ChangeLogEntry
+
+
+def index_duplicates(recipe_ids):
+    """minhash загружает numpy, поэтому импортируется при первой записи,
+    как Base64ImageField."""
+    from recipes import minhash
+
+    minhash.index_recipes(recipe_ids)
+
+
+def recipes_written(recipes, created=False):
+    """Побочные эффекты записи рецептов: журнал изменений, кеши карточек,
+    списков и RSS, ленты подписчиков и индекс дубликатов.
+
+    Хук вызывают и сигналы рецепта, и пакетный импорт, который обходит
+    post_save, поэтому новый побочный эффект записи добавляется только
+    сюда. Дубликаты ищутся после коммита, когда ингредиенты уже записаны.
+    """
+    recipe_ids = [recipe.id for recipe in recipes]
+    changelog.record_many(ChangeLogEntry.RECIPE, ChangeLogEntry.UPSERT,
+                          recipe_ids)
+    if created:
+        coalescing.forget_recipes(recipe_ids)
+        if feed.timeline_enabled():
+            for recipe in recipes:
+                feed.fan_out(recipe)
+    else:
+        coalescing.expire_recipes(recipe_ids)
+    transaction.on_commit(lambda: syndication.recipes_changed(recipe_ids))
+    transaction.on_commit(lambda: index_duplicates(recipe_ids))
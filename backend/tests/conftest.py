@@ -0,0 +1,64 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorites, Ingredients, RecipeIngredient,
+                            Recipes, ShoppingCart, Tags)
+from users.models import Subscriptions, User
+
+IMAGES = ('recipe_images/Моя картинка.png', 'recipe_images/a b.jpg',
+          'recipe_images/plain.png')
+AVATARS = ('avatars/аватар 1.png', '', 'avatars/plain.jpg')
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def catalog(db):
+    """Авторы, рецепты с именами картинок, требующими кодирования, и
+    читатель с избранным, списком покупок и подписками."""
+    authors = [User.objects.create(
+        username=f'author{index}', email=f'author{index}@example.com',
+        first_name=f'Имя{index}', last_name='Автор', avatar=avatar)
+        for index, avatar in enumerate(AVATARS)]
+    reader = User.objects.create(
+        username='reader', email='reader@example.com',
+        first_name='Читатель', last_name='Читатель')
+    tags = [Tags.objects.create(name=name, slug=slug)
+            for name, slug in (('Завтрак', 'breakfast'), ('Обед', 'lunch'),
+                               ('Ужин', 'dinner'))]
+    ingredients = [Ingredients.objects.create(
+        name=f'ингредиент {index}', measurement_unit='г')
+        for index in range(6)]
+    recipes = []
+    for index in range(9):
+        recipe = Recipes.objects.create(
+            author=authors[index % len(authors)], name=f'Рецепт {index}',
+            text=f'Описание {index}', cooking_time=5 + index,
+            image=IMAGES[index % len(IMAGES)])
+        recipe.tags.set(tags[index % 3:index % 3 + 2])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=index + position + 1)
+            for position, ingredient in enumerate(
+                ingredients[index % 4:index % 4 + 3]))
+        recipes.append(recipe)
+    for recipe in recipes[::2]:
+        Favorites.objects.create(user=reader, recipe=recipe)
+    for recipe in recipes[1::3]:
+        ShoppingCart.objects.create(user=reader, recipe=recipe)
+    for author in authors[:2]:
+        Subscriptions.objects.create(subscriber=reader, subscribed_to=author)
+    # Заполнение каталога уже прогрело кеши справочников
+    cache.clear()
+    return {'authors': authors, 'reader': reader, 'recipes': recipes}
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
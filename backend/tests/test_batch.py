@@ -0,0 +1,25 @@
+from django.contrib.auth.models import AnonymousUser
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.urls import ResolverMatch
+from rest_framework.test import APIRequestFactory
+
+from api import batch
+
+TEMPLATES = {'/hello/': 'Привет, {{ name }}',
+             '/broken/': '{% include "нет такого шаблона" %}'}
+
+
+def template_view(request, template):
+    return TemplateResponse(
+        request, engines['django'].from_string(template), {'name': 'мир'})
+
+
+def test_template_response_rendered_per_item(monkeypatch):
+    monkeypatch.setattr(batch, 'resolve', lambda path: ResolverMatch(
+        template_view, (), {'template': TEMPLATES[path]}))
+    request = APIRequestFactory().post('/api/batch/')
+    request.user = AnonymousUser()
+    hello, broken = batch.execute(request, ['/hello/', '/broken/'])
+    assert hello == {'url': '/hello/', 'status': 200, 'body': 'Привет, мир'}
+    assert broken['status'] == 500
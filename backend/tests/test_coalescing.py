@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+from django.db import connections
+from rest_framework.test import APIClient
+
+from api import representations
+from recipes import coalescing
+
+THREADS = 20
+
+
+def burst(target):
+    """Запускает target одновременно в THREADS потоках и возвращает
+    результаты в порядке потоков."""
+    barrier = threading.Barrier(THREADS)
+    results = [None] * THREADS
+
+    def run(index):
+        barrier.wait()
+        try:
+            results[index] = target()
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=run, args=(index,))
+               for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def counting(value, delay=0.2):
+    calls = []
+    lock = threading.Lock()
+
+    def compute():
+        with lock:
+            calls.append(1)
+            number = len(calls)
+        time.sleep(delay)
+        return f'{value}{number}'
+
+    return compute, calls
+
+
+def test_burst_computes_once():
+    compute, calls = counting('value')
+    results = burst(lambda: coalescing.get_or_compute('key', compute, 60))
+    assert len(calls) == 1
+    assert results == ['value1'] * THREADS
+
+
+def test_expired_value_served_while_one_recomputes():
+    compute, calls = counting('value')
+    coalescing.get_or_compute('key', compute, 60, 60)
+    coalescing.expire(['key'], 60)
+    results = burst(lambda: coalescing.get_or_compute('key', compute, 60, 60))
+    assert len(calls) == 2
+    assert results.count('value2') == 1
+    assert results.count('value1') == THREADS - 1
+    assert coalescing.get_or_compute('key', compute, 60, 60) == 'value2'
+
+
+def test_disabled_coalescing_computes_every_time(settings):
+    settings.READ_COALESCING = False
+    compute, calls = counting('value', delay=0)
+    burst(lambda: coalescing.get_or_compute('key', compute, 60))
+    assert len(calls) == THREADS
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica_0'])
+def test_recipe_detail_burst_builds_card_once(catalog, monkeypatch):
+    recipe = catalog['recipes'][0]
+    shared_recipe = representations.shared_recipe
+    calls = []
+
+    def slow_shared_recipe(pk):
+        calls.append(pk)
+        time.sleep(0.2)
+        return shared_recipe(pk)
+
+    monkeypatch.setattr(representations, 'shared_recipe', slow_shared_recipe)
+    responses = burst(
+        lambda: APIClient().get(f'/api/recipes/{recipe.id}/'))
+    assert calls == [recipe.id]
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
@@ -0,0 +1,62 @@
+from collections import Counter
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes import cart, deletion, usage
+from recipes.models import CartIngredient, RecipeIngredient, ShoppingCart
+from tests.test_usage import recounted, stored
+
+pytestmark = pytest.mark.django_db
+
+
+def visible_summary(user):
+    totals = Counter()
+    for item in RecipeIngredient.objects.filter(
+            recipe__shoppingcart__user=user, recipe__is_hidden=False):
+        totals[item.ingredient_id] += item.amount
+    return totals
+
+
+def shown_summary(user):
+    return Counter({row['id']: row['amount'] for row in cart.summary(user)})
+
+
+@pytest.fixture
+def usage_table(catalog):
+    usage.refresh()
+    return catalog
+
+
+def test_hide_recipe_does_not_touch_carts(usage_table):
+    reader = usage_table['reader']
+    recipe = usage_table['recipes'][1]
+    assert ShoppingCart.objects.filter(user=reader, recipe=recipe).exists()
+    totals = cart.actual_totals([reader.id])
+    with CaptureQueriesContext(connection) as queries:
+        job = deletion.hide_recipe(recipe)
+    assert not [query for query in queries.captured_queries
+                if 'cartingredient' in query['sql'].lower()]
+    assert cart.actual_totals([reader.id]) == totals
+    assert shown_summary(reader) == visible_summary(reader)
+
+    deletion.run(job, batch_size=2)
+    assert cart.actual_totals([reader.id]) == cart.expected_totals(
+        [reader.id])
+    assert shown_summary(reader) == visible_summary(reader)
+    assert stored() == recounted()
+
+
+def test_hide_user_subtracts_in_job(usage_table):
+    reader = usage_table['reader']
+    author = usage_table['authors'][1]
+    job = deletion.hide_user(author)
+    assert shown_summary(reader) == visible_summary(reader)
+
+    deletion.run(job, batch_size=2)
+    assert cart.actual_totals([reader.id]) == cart.expected_totals(
+        [reader.id])
+    assert shown_summary(reader) == visible_summary(reader)
+    assert stored() == recounted()
+    assert not CartIngredient.objects.filter(user=author).exists()
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+import pytest
+
+from recipes import jsonl, minhash
+from recipes.models import (ChangeLogEntry, FeedEntry, RecipeDuplicate,
+                            RecipeIngredient, RecipeSignature, Recipes)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def records(catalog):
+    """Копии рецептов первого автора под новыми названиями и датами."""
+    author = catalog['authors'][0]
+    records = list(jsonl.iter_records(
+        Recipes.objects.filter(author=author), chunk_size=10))
+    for number, record in enumerate(records):
+        record['name'] = f'Импорт {number}'
+        record['pub_date'] = (Recipes.objects.get(pk=record['id']).pub_date
+                              + timedelta(days=1)).isoformat()
+    return records
+
+
+def test_import_runs_recipe_write_side_effects(
+        records, catalog, settings, django_capture_on_commit_callbacks):
+    settings.RECIPES_FEED_BACKEND = 'timeline'
+    with django_capture_on_commit_callbacks(execute=True):
+        created = jsonl.import_batch(records)
+    assert created == len(records)
+    imported = list(Recipes.objects.filter(name__startswith='Импорт'))
+    ids = {recipe.id for recipe in imported}
+    assert set(RecipeSignature.objects.filter(
+        recipe_id__in=ids).values_list('recipe_id', flat=True)) == ids
+    assert set(ChangeLogEntry.objects.filter(
+        kind=ChangeLogEntry.RECIPE, object_id__in=ids).values_list(
+            'object_id', flat=True)) == ids
+    entries = dict(FeedEntry.objects.filter(
+        user=catalog['reader'], recipe_id__in=ids).values_list(
+            'recipe_id', 'pub_date'))
+    assert entries == {recipe.id: recipe.pub_date for recipe in imported}
+
+
+def test_saved_recipe_is_indexed_with_its_ingredients(
+        catalog, django_capture_on_commit_callbacks):
+    source = catalog['recipes'][0]
+    minhash.index_recipes([source.id])
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = Recipes.objects.create(
+            author=catalog['authors'][1], name=source.name,
+            text=source.text, cooking_time=source.cooking_time)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id,
+                             amount=1)
+            for ingredient_id in source.recipeingredient_set.values_list(
+                'ingredient_id', flat=True))
+    assert RecipeSignature.objects.filter(recipe=recipe).exists()
+    assert RecipeDuplicate.objects.get(recipe=recipe).original_id == (
+        source.id)
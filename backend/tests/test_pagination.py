@@ -0,0 +1,97 @@
+import pytest
+
+from api import pagination
+
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=['default', 'replica_0'])
+
+
+@pytest.fixture
+def underestimated(settings, monkeypatch, catalog, api_client):
+    """Планировщик оценивает любой список в два объекта."""
+    settings.PAGINATION_COUNT_STRATEGIES = {
+        'recipes-list': pagination.ESTIMATED,
+        'users-list': pagination.ESTIMATED,
+    }
+    monkeypatch.setattr(pagination, 'estimated_count', lambda queryset: 2)
+    api_client.force_authenticate(catalog['reader'])
+    return api_client
+
+
+def test_full_offset_page_links_next(underestimated):
+    data = underestimated.get('/api/recipes/?limit=3').json()
+    assert len(data['results']) == 3
+    assert data['count_is_approximate'] is True
+    assert data['count'] == 3
+    assert 'offset=3' in data['next']
+
+
+def test_offset_past_estimate_returns_objects(underestimated):
+    data = underestimated.get('/api/recipes/?limit=3&offset=3').json()
+    assert len(data['results']) == 3
+    assert 'offset=6' in data['next']
+
+
+def test_partial_offset_page_settles_count(underestimated):
+    data = underestimated.get('/api/recipes/?limit=4&offset=4').json()
+    assert len(data['results']) == 4
+    assert data['next'] is not None
+    data = underestimated.get('/api/recipes/?limit=4&offset=8').json()
+    assert len(data['results']) == 1
+    assert data['count_is_approximate'] is False
+    assert data['count'] == 9
+    assert data['next'] is None
+
+
+def test_page_past_estimate_returns_objects(underestimated):
+    data = underestimated.get('/api/users/?limit=3').json()
+    assert len(data['results']) == 3
+    assert data['count_is_approximate'] is True
+    assert 'page=2' in data['next']
+    data = underestimated.get('/api/users/?limit=3&page=2').json()
+    assert len(data['results']) == 1
+    assert data['count_is_approximate'] is False
+    assert data['count'] == 4
+    assert data['next'] is None
+
+
+def test_exact_count_keeps_default_links(catalog, api_client):
+    data = api_client.get('/api/recipes/?limit=3&offset=6').json()
+    assert len(data['results']) == 3
+    assert data['count'] == 9
+    assert data['next'] is None
+
+
+@pytest.fixture
+def overestimated(settings, monkeypatch, catalog, api_client):
+    """Планировщик оценивает любой список в сто объектов."""
+    settings.PAGINATION_COUNT_STRATEGIES = {
+        'recipes-list': pagination.ESTIMATED,
+        'users-list': pagination.ESTIMATED,
+    }
+    monkeypatch.setattr(pagination, 'estimated_count', lambda queryset: 100)
+    api_client.force_authenticate(catalog['reader'])
+    return api_client
+
+
+def test_empty_offset_page_past_overestimate_ends_list(overestimated):
+    data = overestimated.get('/api/recipes/?limit=3&offset=6').json()
+    assert len(data['results']) == 3
+    assert data['count'] == 100
+    assert 'offset=9' in data['next']
+    data = overestimated.get('/api/recipes/?limit=3&offset=9').json()
+    assert data['results'] == []
+    assert data['count'] == 9
+    assert data['count_is_approximate'] is False
+    assert data['next'] is None
+
+
+def test_empty_page_past_overestimate_ends_list(overestimated):
+    data = overestimated.get('/api/users/?limit=2&page=2').json()
+    assert len(data['results']) == 2
+    assert 'page=3' in data['next']
+    data = overestimated.get('/api/users/?limit=2&page=3').json()
+    assert data['results'] == []
+    assert data['count'] == 4
+    assert data['count_is_approximate'] is False
+    assert data['next'] is None
@@ -0,0 +1,116 @@
+import pytest
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api import db_router
+from api.middleware import ReplicaRoutingMiddleware
+from recipes.models import Recipes, Tags
+
+pytestmark = pytest.mark.django_db(databases=['default', 'replica_0'])
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    cache.clear()
+    db_router._down_until.clear()
+    yield
+    db_router._down_until.clear()
+
+
+def view(status):
+    def get_response(request):
+        response = HttpResponse(status=status)
+        response.read_db = Recipes.objects.all().db
+        response.token_db = Token.objects.all().db
+        return response
+    return get_response
+
+
+def call(method, path, status=200, **extra):
+    request = getattr(RequestFactory(), method)(path, **extra)
+    return ReplicaRoutingMiddleware(view(status))(request)
+
+
+def test_safe_api_read_uses_replica():
+    response = call('get', '/api/recipes/')
+    assert response.read_db == 'replica_0'
+    assert response.token_db == 'default'
+    assert db_router.read_alias.get() is None
+
+
+def test_writes_and_other_paths_use_primary():
+    assert call('post', '/api/recipes/', 201).read_db == 'default'
+    assert call('get', '/admin/').read_db == 'default'
+
+
+def test_read_only_post_uses_replica():
+    assert call('post', '/api/batch/').read_db == 'replica_0'
+
+
+def test_write_pins_browser_by_cookie():
+    response = call('post', '/api/recipes/', 201)
+    cookie = response.cookies[ReplicaRoutingMiddleware.cookie_name]
+    assert cookie['max-age'] > 0
+    request = RequestFactory()
+    request.cookies[cookie.key] = cookie.value
+    response = ReplicaRoutingMiddleware(view(200))(
+        request.get('/api/recipes/'))
+    assert response.read_db == 'default'
+
+
+def test_write_pins_token_client():
+    call('post', '/api/recipes/', 201, HTTP_AUTHORIZATION='Token first')
+    pinned = call('get', '/api/recipes/', HTTP_AUTHORIZATION='Token first')
+    other = call('get', '/api/recipes/', HTTP_AUTHORIZATION='Token second')
+    assert pinned.read_db == 'default'
+    assert other.read_db == 'replica_0'
+
+
+def test_failed_write_does_not_pin():
+    response = call('post', '/api/recipes/', 400,
+                    HTTP_AUTHORIZATION='Token first')
+    assert ReplicaRoutingMiddleware.cookie_name not in response.cookies
+    assert call('get', '/api/recipes/',
+                HTTP_AUTHORIZATION='Token first').read_db == 'replica_0'
+
+
+def refuse_connections(monkeypatch):
+    attempts = []
+
+    def refuse():
+        attempts.append(1)
+        raise OperationalError('replica is down')
+
+    monkeypatch.setattr(connections['replica_0'], 'ensure_connection',
+                        refuse)
+    return attempts
+
+
+def test_dead_replica_is_skipped(monkeypatch):
+    attempts = refuse_connections(monkeypatch)
+    assert call('get', '/api/recipes/').read_db == 'default'
+    assert call('get', '/api/recipes/').read_db == 'default'
+    assert len(attempts) == 1
+
+
+def test_replica_is_retried_after_timeout(monkeypatch, settings):
+    settings.REPLICA_RETRY_SECONDS = 0
+    refuse_connections(monkeypatch)
+    assert call('get', '/api/recipes/').read_db == 'default'
+    monkeypatch.undo()
+    assert call('get', '/api/recipes/').read_db == 'replica_0'
+
+
+@pytest.mark.django_db(transaction=True,
+                       databases=['default', 'replica_0'])
+def test_api_request_reads_through_replica(client):
+    Tags.objects.create(name='Завтрак', slug='breakfast')
+    with CaptureQueriesContext(connections['replica_0']) as queries:
+        response = client.get('/api/tags/')
+    assert response.status_code == 200
+    assert any('recipes_tags' in query['sql'] for query in queries)
+    assert [tag['slug'] for tag in response.json()] == ['breakfast']
@@ -0,0 +1,126 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import RecipesSerializer
+from recipes.models import Recipes
+from users.models import User
+from users.serializers import UserSerializer
+
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=['default', 'replica_0'])
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+def serializer_request(user):
+    request = RequestFactory().get('/')
+    request.user = user or AnonymousUser()
+    return request
+
+
+def expected_recipes(ids, user, many=True):
+    recipes = Recipes.objects.in_bulk(ids)
+    context = {'request': serializer_request(user)}
+    if not many:
+        return RecipesSerializer(recipes[ids[0]], context=context).data
+    return RecipesSerializer([recipes[pk] for pk in ids], many=True,
+                             context=context).data
+
+
+def expected_users(ids, user, many=True):
+    users = User.objects.in_bulk(ids)
+    context = {'request': serializer_request(user)}
+    if not many:
+        return UserSerializer(users[ids[0]], context=context).data
+    return UserSerializer([users[pk] for pk in ids], many=True,
+                          context=context).data
+
+
+@pytest.fixture(params=['anonymous', 'reader'])
+def reader(request, catalog, api_client):
+    user = catalog['reader'] if request.param == 'reader' else None
+    if user:
+        api_client.force_authenticate(user)
+    return user
+
+
+def test_recipe_list_matches_serializer(catalog, reader, api_client):
+    results = api_client.get('/api/recipes/?limit=100').json()['results']
+    ids = [recipe['id'] for recipe in results]
+    assert sorted(ids) == sorted(recipe.id for recipe in catalog['recipes'])
+    assert render(results) == render(expected_recipes(ids, reader))
+
+
+def test_recipe_detail_matches_serializer(catalog, reader, api_client):
+    for recipe in catalog['recipes']:
+        expected = render(expected_recipes([recipe.id], reader, many=False))
+        # Второй запрос отдает общую карточку из кеша
+        for _ in range(2):
+            response = api_client.get(f'/api/recipes/{recipe.id}/')
+            assert render(response.json()) == expected
+
+
+def test_recipe_detail_encodes_image_once(catalog, api_client):
+    recipe = catalog['recipes'][0]
+    api_client.get(f'/api/recipes/{recipe.id}/')
+    image = api_client.get(f'/api/recipes/{recipe.id}/').json()['image']
+    assert image.endswith(
+        '/media/recipe_images/%D0%9C%D0%BE%D1%8F%20'
+        '%D0%BA%D0%B0%D1%80%D1%82%D0%B8%D0%BD%D0%BA%D0%B0.png')
+
+
+def test_feed_matches_serializer(catalog, api_client):
+    reader = catalog['reader']
+    api_client.force_authenticate(reader)
+    results = api_client.get('/api/recipes/feed/?limit=100').json()[
+        'results']
+    ids = [recipe['id'] for recipe in results]
+    followed = {author.id for author in catalog['authors'][:2]}
+    assert sorted(ids) == sorted(recipe.id for recipe in catalog['recipes']
+                                 if recipe.author_id in followed)
+    assert render(results) == render(expected_recipes(ids, reader))
+
+
+def test_user_list_matches_serializer(catalog, reader, api_client):
+    results = api_client.get('/api/users/?limit=100').json()['results']
+    ids = [user['id'] for user in results]
+    assert sorted(ids) == sorted(
+        User.objects.filter(is_hidden=False).values_list('id', flat=True))
+    assert render(results) == render(expected_users(ids, reader))
+
+
+def test_user_detail_matches_serializer(catalog, reader, api_client):
+    for user in catalog['authors']:
+        response = api_client.get(f'/api/users/{user.id}/')
+        assert render(response.json()) == render(
+            expected_users([user.id], reader, many=False))
+
+
+def test_me_matches_serializer(catalog, api_client):
+    reader = catalog['reader']
+    api_client.force_authenticate(reader)
+    assert render(api_client.get('/api/users/me/').json()) == render(
+        expected_users([reader.id], reader, many=False))
+
+
+def test_profile_change_refreshes_cached_cards(catalog, api_client):
+    author = catalog['authors'][0]
+    recipe = next(recipe for recipe in catalog['recipes']
+                  if recipe.author_id == author.id)
+    api_client.get(f'/api/recipes/{recipe.id}/')
+    api_client.get('/api/recipes/?limit=100')
+    author.first_name = 'Новое имя'
+    author.save()
+    author.avatar = 'avatars/новый аватар.png'
+    author.save(update_fields=['avatar'])
+
+    response = api_client.get(f'/api/recipes/{recipe.id}/')
+    assert render(response.json()) == render(
+        expected_recipes([recipe.id], None, many=False))
+    results = api_client.get('/api/recipes/?limit=100').json()['results']
+    assert render(results) == render(
+        expected_recipes([item['id'] for item in results], None))
@@ -0,0 +1,19 @@
+import pytest
+
+from recipes import deletion
+
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=['default', 'replica_0'])
+
+
+def test_similar_of_missing_recipe_is_404(catalog, api_client):
+    assert api_client.get('/api/recipes/999999/similar/').status_code == 404
+
+
+def test_similar_of_hidden_recipe_is_404(catalog, api_client):
+    recipe = catalog['recipes'][0]
+    assert api_client.get(
+        f'/api/recipes/{recipe.id}/similar/').status_code == 200
+    deletion.hide_recipe(recipe)
+    assert api_client.get(
+        f'/api/recipes/{recipe.id}/similar/').status_code == 404
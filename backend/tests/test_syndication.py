@@ -0,0 +1,65 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes import syndication
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    calls = []
+    build = syndication.build
+
+    def counting_build(author_id=None):
+        calls.append(author_id)
+        return build(author_id)
+
+    monkeypatch.setattr(syndication, 'build', counting_build)
+    return calls
+
+
+def titles(feed):
+    return [item['title'] for item in feed['items']]
+
+
+def test_edit_patches_cached_feeds(catalog, builds,
+                                   django_capture_on_commit_callbacks):
+    recipe = catalog['recipes'][0]
+    syndication.get_feed()
+    syndication.get_feed(recipe.author_id)
+    recipe.name = 'Новое название'
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.save()
+    with CaptureQueriesContext(connection) as queries:
+        site = syndication.get_feed()
+        author = syndication.get_feed(recipe.author_id)
+    assert not queries.captured_queries
+    assert builds == [None, recipe.author_id]
+    assert 'Новое название' in titles(site)
+    assert 'Новое название' in titles(author)
+    assert 'Новое название' in site['blobs']['rss'][0]
+
+
+def test_publish_adds_item_on_top(catalog, builds,
+                                  django_capture_on_commit_callbacks):
+    syndication.get_feed()
+    source = catalog['recipes'][0]
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = type(source).objects.create(
+            author=source.author, name='Свежий рецепт', text='Текст',
+            cooking_time=5)
+    assert titles(syndication.get_feed())[0] == recipe.name
+    assert builds == [None]
+
+
+def test_patch_during_build_forces_rebuild(catalog, builds):
+    syndication.get_feed()
+    recipe = catalog['recipes'][0]
+    cache.add(syndication.feed_key(None) + ':lock', 1)
+    type(recipe).objects.filter(pk=recipe.pk).update(name='Переименован')
+    syndication.recipes_changed([recipe.pk])
+    assert 'Переименован' in titles(syndication.get_feed())
+    assert builds == [None, None]
@@ -0,0 +1,76 @@
+import base64
+import io
+
+import pytest
+from django.db import connection
+from PIL import Image
+
+from recipes import deletion, usage
+from recipes.models import IngredientUsage, Ingredients
+
+pytestmark = pytest.mark.django_db
+
+
+def stored():
+    return {row[0]: row[1:] for row in IngredientUsage.objects.values_list(
+        *usage.COLUMNS) if any(row[1:])}
+
+
+def recounted():
+    with connection.cursor() as cursor:
+        cursor.execute(*usage.usage_query())
+        return {row[0]: row[1:] for row in cursor.fetchall() if any(row[1:])}
+
+
+def image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+def recipe_data(ingredients, tag):
+    return {'name': 'Новый рецепт', 'text': 'Описание', 'cooking_time': 10,
+            'image': image(), 'tags': [tag.id],
+            'ingredients': [{'id': ingredient.id, 'amount': 5}
+                            for ingredient in ingredients]}
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+def test_counters_follow_recipe_and_cart_changes(
+        catalog, api_client, media):
+    usage.refresh()
+    reader = catalog['reader']
+    api_client.force_authenticate(reader)
+    ingredients = list(Ingredients.objects.order_by('id'))
+    tag = catalog['recipes'][0].tags.first()
+
+    response = api_client.post(
+        '/api/recipes/', recipe_data(ingredients[:3], tag), format='json')
+    assert response.status_code == 201, response.content
+    recipe_id = response.json()['id']
+    assert stored() == recounted()
+
+    assert api_client.post(
+        f'/api/recipes/{recipe_id}/shopping_cart/').status_code == 201
+    assert stored() == recounted()
+
+    response = api_client.patch(
+        f'/api/recipes/{recipe_id}/',
+        recipe_data(ingredients[2:5], tag), format='json')
+    assert response.status_code == 200, response.content
+    assert stored() == recounted()
+
+    assert api_client.delete(
+        f'/api/recipes/{recipe_id}/shopping_cart/').status_code == 204
+    assert stored() == recounted()
+
+    deletion.hide_recipe(catalog['recipes'][1])
+    assert stored() == recounted()
+
+    ingredients[0].delete()
+    assert stored() == recounted()
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 с числом итераций из PASSWORD_PBKDF2_ITERATIONS.
+
+    Хеши с другим числом итераций проходят проверку как обычно и
+    пересчитываются при следующем входе пользователя.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-19 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_hidden',
+            field=models.BooleanField(default=False, verbose_name='Скрыт до удаления'),
+        ),
+    ]
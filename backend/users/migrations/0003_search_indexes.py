@@ -0,0 +1,48 @@
+from django.db import migrations
+
+FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+
+def index_name(field):
+    return f'users_user_{field}_lower_idx'
+
+
+def create_indexes(apps, schema_editor):
+    """Индексы по lower(поле): на PostgreSQL с text_pattern_ops, чтобы
+    LIKE 'префикс%' работал по индексу при любой локали базы.
+    Создаются CONCURRENTLY, не блокируя запись в таблицу."""
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        return
+    table = apps.get_model('users', 'User')._meta.db_table
+    for field in FIELDS:
+        if vendor == 'postgresql':
+            schema_editor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name(field)} '
+                f'ON {table} (lower({field}) text_pattern_ops)')
+        else:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {index_name(field)} '
+                f'ON {table} (lower({field}))')
+
+
+def drop_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        return
+    concurrently = 'CONCURRENTLY ' if vendor == 'postgresql' else ''
+    for field in FIELDS:
+        schema_editor.execute(
+            f'DROP INDEX {concurrently}IF EXISTS {index_name(field)}')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('users', '0002_hidden'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -17,6 +17,8 @@ class User(AbstractUser):
                                  verbose_name='Фамилия')
     avatar = models.ImageField(upload_to='avatars/',
                                blank=True, default='')
+    is_hidden = models.BooleanField(default=False,
+                                    verbose_name='Скрыт до удаления')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = (
         'username',
@@ -0,0 +1,29 @@
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+
+SEARCH_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+
+def search_users(queryset, term):
+    """Пользователи, у которых каждое слово term — начало одного из полей
+    SEARCH_FIELDS без учета регистра. Сначала идут точные совпадения
+    всей строки с одним из полей, затем совпадения по началу.
+
+    Условия сравнивают lower(поле) с префиксом, поэтому используют
+    индексы по lower() из миграции users.0003_search_indexes.
+    """
+    term = ' '.join(term.lower().split())
+    if not term:
+        return queryset
+    queryset = queryset.annotate(**{
+        f'{field}_lower': Lower(field) for field in SEARCH_FIELDS})
+    for word in term.split():
+        queryset = queryset.filter(Q(*(
+            (f'{field}_lower__startswith', word) for field in SEARCH_FIELDS
+        ), _connector=Q.OR))
+    exact = Q(*((f'{field}_lower', term) for field in SEARCH_FIELDS),
+              _connector=Q.OR)
+    return queryset.annotate(search_rank=Case(
+        When(exact, then=Value(0)), default=Value(1),
+        output_field=IntegerField(),
+    )).order_by('search_rank', 'username_lower', 'id')
@@ -2,8 +2,8 @@ from rest_framework import serializers
 from rest_framework.serializers import ValidationError
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from drf_extra_fields.fields import Base64ImageField
 
+from api.fields import Base64ImageField
 from users.models import User, Subscriptions
 from recipes.models import Recipes
 
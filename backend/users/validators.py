@@ -0,0 +1,25 @@
+import functools
+import gzip
+
+from django.contrib.auth import password_validation
+
+DEFAULT_PATH = (password_validation.CommonPasswordValidator
+                .DEFAULT_PASSWORD_LIST_PATH)
+
+
+@functools.lru_cache(maxsize=None)
+def load_passwords(path):
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            return frozenset(line.strip() for line in file)
+    except OSError:
+        with open(path) as file:
+            return frozenset(line.strip() for line in file)
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    """Список частых паролей читается один раз на процесс. Прогрев в
+    мастере gunicorn загружает его до fork, и воркеры делят одну копию."""
+
+    def __init__(self, password_list_path=DEFAULT_PATH):
+        self.passwords = load_passwords(str(password_list_path))
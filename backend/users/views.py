@@ -1,7 +1,8 @@
-from django.db.models import Count
+from django.db.models import Count, Q
 from django.core.exceptions import ValidationError
 from django.http import Http404
 from django.shortcuts import get_object_or_404
+from djoser.views import TokenCreateView as BaseTokenCreateView
 from djoser.views import UserViewSet as BaseUserViewSet
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
@@ -10,25 +11,66 @@ from rest_framework.decorators import action
 
 from users.models import (User, Subscriptions)
 from users.serializers import (UserSerializer, AvatarSerializer,
-                               SubscribeSerializer)
+                               SubscribeSerializer, ShortRecipeSerializer)
+from recipes import coalescing, deletion
+from recipes.models import Recipes
+from api import representations
+from api.idempotency import idempotent
+from api.filters import UserFilter
 from api.pagination import CustomPageNumberPagination
 
 
 class UserViewSet(BaseUserViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.filter(is_hidden=False)
     serializer_class = UserSerializer
     pagination_class = CustomPageNumberPagination
     permission_classes = [AllowAny]
+    filterset_class = UserFilter
+    throttle_scope = None
+
+    def represent(self, user):
+        row = representations.instance_row(user, representations.USER_FIELDS)
+        return representations.users([row], self.request.user)[0]
+
+    def get_count_versions(self):
+        if self.action == 'subscriptions':
+            return [coalescing.USER_LIST,
+                    coalescing.USER_LISTS.format(self.request.user.pk)]
+        return [coalescing.USER_LIST]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(
+            queryset.values(*representations.USER_FIELDS))
+        return self.get_paginated_response(
+            representations.users(page, request.user))
+
+    def perform_destroy(self, instance):
+        deletion.hide_user(instance)
+
+    def get_throttles(self):
+        if self.action == 'create':
+            self.throttle_scope = 'registration'
+        return super().get_throttles()
 
     @action(detail=False, methods=['get'],
             permission_classes=[IsAuthenticated])
     def me(self, request):
-        user = request.user
-        serializer = UserSerializer(instance=user,
-                                    context={'request': request})
-        return Response(serializer.data)
+        return Response(self.represent(request.user))
 
-    @action(detail=True, methods=['PUT'], permission_classes=[IsAuthenticated])
+    @action(detail=False, methods=['get'], url_path='me/recommended',
+            permission_classes=[IsAuthenticated])
+    def recommended(self, request):
+        queryset = Recipes.objects.filter(
+            recommended_to__user=request.user
+        ).order_by('-recommended_to__score')
+        page = self.paginate_queryset(queryset)
+        serializer = ShortRecipeSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['PUT'], permission_classes=[IsAuthenticated],
+            throttle_scope='uploads')
+    @idempotent
     def avatar(self, request, *args, **kwargs):
         user = request.user
         serializer = AvatarSerializer(user, data=request.data)
@@ -42,18 +84,16 @@ class UserViewSet(BaseUserViewSet):
     @avatar.mapping.delete
     def delete_avatar(self, request, *args, **kwargs):
         user = request.user
-        current_avatar = user.avatar
         user.avatar = None
         user.save(update_fields=['avatar'])
-        if current_avatar:
-            current_avatar.delete(save=False)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['POST', 'DELETE'],
             permission_classes=[IsAuthenticated])
     def subscribe(self, request, *args, **kwargs):
         subscriber = request.user
-        subscribed_to = get_object_or_404(User, id=self.kwargs.get('id'))
+        subscribed_to = get_object_or_404(self.queryset,
+                                          id=self.kwargs.get('id'))
 
         if request.method == 'POST':
             serializer = SubscribeSerializer(subscribed_to, data=request.data,
@@ -79,8 +119,9 @@ class UserViewSet(BaseUserViewSet):
             permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(subscribers__subscriber=user).annotate(
-            recipes_count=Count('recipes'))
+        queryset = self.queryset.filter(
+            subscribers__subscriber=user).annotate(recipes_count=Count(
+                'recipes', filter=Q(recipes__is_hidden=False)))
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = SubscribeSerializer(page, many=True,
@@ -100,7 +141,8 @@ class UserViewSet(BaseUserViewSet):
                 raise Http404
 
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object(kwargs.get('id'))
-        serializer = self.get_serializer(instance,
-                                         context={'request': request})
-        return Response(serializer.data)
+        return Response(self.represent(self.get_object(kwargs.get('id'))))
+
+
+class TokenCreateView(BaseTokenCreateView):
+    throttle_scope = 'login'